@@ -1,9 +1,16 @@
-# To start the API server: uvicorn src.api.mock_api:app --reload --host 0.0.0.0 --port 8000
-import random
+# To start the API server: uvicorn src.api.mock_api:app --reload --host 0.0.0.0 --port 8000 --loop uvloop --http httptools
+# uvloop + httptools replace the stdlib asyncio loop and h11 parser (uvicorn picks them up automatically when installed)
+import base64
 import os
-from dotenv import load_dotenv
+from src.utils.config_loader import load_env
 from fastapi import FastAPI, HTTPException, Depends, Header
-from src.api.mock_event_generator import generate_valid_event, generate_invalid_event
+from fastapi.responses import ORJSONResponse
+from src.api.mock_event_generator import (
+    generate_valid_event,
+    generate_valid_events_batch,
+    generate_invalid_event,
+    rng,
+)
 
 """
 Mock Security Event Ingestion API
@@ -15,19 +22,24 @@ security events, batch generation, pagination, and diagnostic endpoints.
 Used by the `incident_response_timeline` ETL pipeline during the Extract phase.
 """
 
-app = FastAPI()
+# ORJSONResponse serializes large /events/batch payloads much faster than stdlib json
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # In-memory event store – persists only while the API is running.
 # Valid events from batch ingestion are appended here.
 event_store = []
 
+# Index of event_store keyed by event_id for O(1) lookups.
+# Must be kept in sync wherever events are appended or cleared.
+event_index: dict[str, dict] = {}
+
 
 # ---------------------------------------------------------------------------
 # API KEY AUTHENTICATION
 # ---------------------------------------------------------------------------
 
 # Load environment file into OS memory
-load_dotenv("config/.env")
+load_env()
 
 # Access environmental variables
 API_KEY = os.getenv("API_KEY")
@@ -39,7 +51,9 @@ if not API_KEY:
 
 # Verifies that the incoming request contains the correct API key.
 # All ingestion endpoints use this dependency.
-def verify_api_key(x_api_key: str = Header(None)):
+# Endpoints and dependencies are async: they only touch in-memory state, so running them
+# on the event loop avoids FastAPI's threadpool hop for sync handlers.
+async def verify_api_key(x_api_key: str = Header(None)):
 
     if x_api_key != API_KEY:
         raise HTTPException(status_code=401, detail="Invalid or missing API Key")
@@ -53,14 +67,14 @@ def verify_api_key(x_api_key: str = Header(None)):
 
 # Simple home route for smoke testing.
 @app.get("/")
-def home():
+async def home():
     return {"HELLO": "WORLD!"}
 
 
 # Health check endpoint.
 # Unprotected so Docker/Kubernetes/Airflow can probe it freely.
 @app.get("/health")
-def health():
+async def health():
 
     return {"STATUS": "HEALTHY"}
 
@@ -73,31 +87,58 @@ def health():
 # Generate a single valid event and store it.
 # Used for unit tests and small ingestion checks.
 @app.get("/events", dependencies=[Depends(verify_api_key)])
-def get_events():
+async def get_events():
 
     event = generate_valid_event()
     event_store.append(event)
+    event_index[event["event_id"]] = event
     return event
 
 
-# Paginate stored events. Simulates a SIEM browsing interface.
-@app.get("/events/paginated", dependencies=[Depends(verify_api_key)])
-def get_paginated_events(page: int = 1, limit: int = 5):
+# Encodes a position in event_store as an opaque cursor string.
+# event_store is append-only, so an event's list index doubles as its sequence number.
+def encode_cursor(seq: int) -> str:
+    return base64.urlsafe_b64encode(str(seq).encode()).decode()
+
+
+# Decodes a cursor produced by encode_cursor() back into a sequence number.
+def decode_cursor(cursor: str) -> int:
+    try:
+        seq = int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if seq < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return seq
+
+
+# Paginate stored events using cursor (keyset) pagination. Simulates a SIEM browsing interface.
+# `after` is the next_cursor returned by the previous page; omit it to start from the beginning.
+# When event_store moves to SQL the cursor maps to: WHERE seq > :cursor ORDER BY seq LIMIT :limit
+@app.get("/events/paginated", dependencies=[Depends(verify_api_key)], response_model=None)
+async def get_paginated_events(after: str | None = None, limit: int = 5):
 
-    if page < 1:
-        raise HTTPException(status_code=400, detail="Page must be >= 1")
     if limit < 1:
         raise HTTPException(status_code=400, detail="Limit must be >= 1")
 
-    start = (page - 1) * limit
-    end = start + limit
+    start = decode_cursor(after) + 1 if after is not None else 0
+    events = event_store[start : start + limit]
+
+    # Only hand out a cursor when there may be more events to read
+    next_cursor = None
+    if events and start + len(events) < len(event_store):
+        next_cursor = encode_cursor(start + len(events) - 1)
 
-    return {
-        "page": page,
-        "limit": limit,
-        "total": len(event_store),
-        "events": event_store[start:end],
-    }
+    # Returning the response directly skips FastAPI's recursive jsonable_encoder walk
+    return ORJSONResponse(
+        content={
+            "limit": limit,
+            "total": len(event_store),
+            "events": events,
+            "next_cursor": next_cursor,
+        }
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -110,8 +151,8 @@ def get_paginated_events(page: int = 1, limit: int = 5):
 # - Invalid events are generated but *not* stored.
 # - Returns a shuffled mix of events to simulate unordered log arrival.
 # Used by extract_security_events.py during ETL Extract phase.
-@app.get("/events/batch", dependencies=[Depends(verify_api_key)])
-def get_events_batch(size: int = 10, fault_rate: float = 0.0):
+@app.get("/events/batch", dependencies=[Depends(verify_api_key)], response_model=None)
+async def get_events_batch(size: int = 10, fault_rate: float = 0.0):
 
     # Validate input
     if size < 1:
@@ -125,28 +166,32 @@ def get_events_batch(size: int = 10, fault_rate: float = 0.0):
     invalid_count = int(size * fault_rate)
     valid_count = size - invalid_count
 
-    events = []
+    # Generate valid events in one vectorized batch
+    events = generate_valid_events_batch(valid_count)
 
-    # Generate valid events
-    for _ in range(valid_count):
-        event = generate_valid_event()
-        events.append(event)
-        event_store.append(event)  # Only valid events are stored
+    # Only valid events are stored
+    for event in events:
+        event_store.append(event)
+        event_index[event["event_id"]] = event
 
     # Generate invalid events
     for _ in range(invalid_count):
         events.append(generate_invalid_event())
 
     # Simulate real-world unordered arrival
-    random.shuffle(events)
+    # One NumPy permutation (C loop) instead of random.shuffle's Python-level Fisher-Yates
+    events = [events[i] for i in rng.permutation(len(events)).tolist()]
 
-    return {
-        "size": size,
-        "fault_rate": fault_rate,
-        "valid_events": valid_count,
-        "invalid_events": invalid_count,
-        "events": events,
-    }
+    # Returning the response directly skips FastAPI's recursive jsonable_encoder walk
+    return ORJSONResponse(
+        content={
+            "size": size,
+            "fault_rate": fault_rate,
+            "valid_events": valid_count,
+            "invalid_events": invalid_count,
+            "events": events,
+        }
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -157,10 +202,10 @@ def get_events_batch(size: int = 10, fault_rate: float = 0.0):
 # Returns metadata about the current event store.
 # Useful for monitoring, debugging, and metrics tracking.
 @app.get("/events/stats", dependencies=[Depends(verify_api_key)])
-def get_event_stats():
+async def get_event_stats():
 
     total = len(event_store)
-    unique_ids = len({e["event_id"] for e in event_store})
+    unique_ids = len(event_index)
 
     return {"total_events": total, "unique_event_ids": unique_ids}
 
@@ -169,10 +214,11 @@ def get_event_stats():
 # NOTE: Only for local testing / development.
 # Do NOT include in production APIs.
 @app.delete("/events/clear", dependencies=[Depends(verify_api_key)])
-def clear_event_store():
+async def clear_event_store():
 
     count = len(event_store)
     event_store.clear()
+    event_index.clear()
 
     return {"status": "success", "cleared_events": count}
 
@@ -186,10 +232,10 @@ def clear_event_store():
 # Retrieve a single event from the in-memory store.
 # Useful for debugging and validation training.
 @app.get("/events/{event_id}", dependencies=[Depends(verify_api_key)])
-def get_event_by_id(event_id: str):
+async def get_event_by_id(event_id: str):
 
-    for event in event_store:
-        if event["event_id"] == event_id:
-            return event
+    event = event_index.get(event_id)
+    if event is not None:
+        return event
 
     raise HTTPException(status_code=404, detail="event_id does not exist")
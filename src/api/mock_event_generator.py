@@ -1,13 +1,16 @@
 # Run this script in terminal: python3 src/api/mock_event_generator.py
-import uuid
+import os
+import secrets
+import time
 from datetime import datetime, timezone, timedelta # timedelta used to store time interval
 import random
+import numpy as np
 
 # =================================== VALID EVENTS GENERATOR =========================================#
 # Allowed values
-allowed_severity = ["low", "medium", "high", "critical"]
+allowed_severity = ("low", "medium", "high", "critical")
 
-allowed_event_types = [
+allowed_event_types = (
     "unauthorized_login",
     "malware_detected",
     "port_scan",
@@ -18,7 +21,15 @@ allowed_event_types = [
     "unauthorized_access",
     "phishing_click",
     "firewall_block",
-]
+)
+
+# Valid public first octets (1–223 excluding 10, 127, 172, 192)
+# Built once at import so random.choice() indexes a preallocated sequence
+allowed_first_octets = tuple(i for i in range(1, 224) if i not in {10, 127, 172, 192})
+
+# Preformatted strings for every octet value (0–255)
+# IP formatting indexes this table instead of converting each int to str
+octet_strings = tuple(str(i) for i in range(256))
 
 
 event_descriptions = {
@@ -36,10 +47,15 @@ event_descriptions = {
 
 
 # Generates unique event_id
+# 8 random hex chars straight from os.urandom (same 32-bit space as uuid4().hex[:8])
 def generate_unique_event_id():
-    unique_id = uuid.uuid4().hex[:8]
-    event_id = f"evt_{unique_id}"
-    return event_id
+    return "evt_" + secrets.token_hex(4)
+
+
+# Generates n unique event_ids from a single os.urandom() read
+def generate_unique_event_ids_batch(n):
+    token = os.urandom(4 * n).hex()
+    return ["evt_" + token[i * 8 : (i + 1) * 8] for i in range(n)]
 
 
 # Generate timestamp for security events
@@ -53,24 +69,27 @@ def generate_timestamp():
 
 # Generate a valid PUBLIC IPv4 address for source_ip
 def generate_public_ip():
-    # Valid first octets (1–223 but excluding 10, 127, 172, 192)
-    invalid = {10, 127, 172, 192}
-    first = random.choice([i for i in range(1, 224) if i not in invalid])
+    first = random.choice(allowed_first_octets)
 
-    return f"{first}.{random.randint(0,255)}.{random.randint(0,255)}.{random.randint(1,254)}"
+    return (
+        f"{octet_strings[first]}.{octet_strings[random.randint(0, 255)]}."
+        f"{octet_strings[random.randint(0, 255)]}.{octet_strings[random.randint(1, 254)]}"
+    )
 
 
 # Generate a valid PRIVATE IPv4 address for destination_ip
 def generate_private_ip():
-    # list of the THREE valid private IP ranges, each represented as a tuple
-    private_blocks = [
-        (10, random.randint(0, 255), random.randint(0, 255), random.randint(1, 254)),
-        (192, 168, random.randint(0, 255), random.randint(1, 254)),
-        (172, random.randint(16, 31), random.randint(0, 255), random.randint(1, 254)),
-    ]
+    # Pick one of the THREE valid private IP ranges first, then draw only that block's octets
+    block = random.randrange(3)
+
+    if block == 0:
+        first, second = "10", octet_strings[random.randint(0, 255)]
+    elif block == 1:
+        first, second = "192", "168"
+    else:
+        first, second = "172", octet_strings[random.randint(16, 31)]
 
-    block = random.choice(private_blocks)
-    return ".".join(str(part) for part in block)
+    return f"{first}.{second}.{octet_strings[random.randint(0, 255)]}.{octet_strings[random.randint(1, 254)]}"
 
 
 # Generate random event typpe
@@ -104,6 +123,81 @@ def generate_valid_event():
     }
 
 
+# =================================== BATCH EVENTS GENERATOR =========================================#
+# Valid public first octets as an array for vectorized draws
+valid_first_octets_array = np.array(allowed_first_octets, dtype=np.uint8)
+
+# Shared NumPy generator for the batch path
+rng = np.random.default_rng()
+
+
+# Generate n timestamps sharing a single "now"
+# Subtracts a random number of minutes (0–59) per event using integer epoch arithmetic,
+# which avoids a datetime.now() call and datetime.strftime() per event
+def generate_timestamps_batch(n):
+    base_ts = int(time.time())
+    deltas = rng.integers(0, 60, size=n) * 60
+    return [time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(base_ts - d)) for d in deltas.tolist()]
+
+
+# Joins an (n, 4) array of octets into dotted-quad strings
+def format_ips(octets):
+    o = octet_strings
+    return [f"{o[a]}.{o[b]}.{o[c]}.{o[d]}" for a, b, c, d in octets.tolist()]
+
+
+# Generate n valid PUBLIC IPv4 addresses in one vectorized draw
+def generate_public_ips_batch(n):
+    octets = np.empty((n, 4), dtype=np.uint8)
+    octets[:, 0] = rng.choice(valid_first_octets_array, size=n)
+    octets[:, 1:3] = rng.integers(0, 256, size=(n, 2), dtype=np.uint8)
+    octets[:, 3] = rng.integers(1, 255, size=n, dtype=np.uint8)
+    return format_ips(octets)
+
+
+# Generate n valid PRIVATE IPv4 addresses in one vectorized draw
+# Each address picks one of the three private blocks: 10.x.x.x, 192.168.x.x, 172.16-31.x.x
+def generate_private_ips_batch(n):
+    block = rng.integers(0, 3, size=n)
+    octets = np.empty((n, 4), dtype=np.uint8)
+    octets[:, 0] = np.choose(block, [10, 192, 172])
+    octets[:, 1] = np.where(
+        block == 0,
+        rng.integers(0, 256, size=n),
+        np.where(block == 1, 168, rng.integers(16, 32, size=n)),
+    )
+    octets[:, 2] = rng.integers(0, 256, size=n, dtype=np.uint8)
+    octets[:, 3] = rng.integers(1, 255, size=n, dtype=np.uint8)
+    return format_ips(octets)
+
+
+# Generate n valid security events
+# Same output as calling generate_valid_event() n times, but every field is drawn for the whole batch at once
+# and the dicts are built in a single comprehension (no per-event helper calls)
+def generate_valid_events_batch(n):
+    event_ids = generate_unique_event_ids_batch(n)
+    timestamps = generate_timestamps_batch(n)
+    source_ips = generate_public_ips_batch(n)
+    destination_ips = generate_private_ips_batch(n)
+    event_types = [allowed_event_types[i] for i in rng.integers(0, len(allowed_event_types), size=n).tolist()]
+    severities = [allowed_severity[i] for i in rng.integers(0, len(allowed_severity), size=n).tolist()]
+
+    return [
+        {
+            "event_id": event_id,
+            "timestamp": timestamp,
+            "source_ip": source_ip,
+            "destination_ip": destination_ip,
+            "event_type": event_type,
+            "severity": severity,
+            "description": event_descriptions[event_type],
+        }
+        for event_id, timestamp, source_ip, destination_ip, event_type, severity in zip(
+            event_ids, timestamps, source_ips, destination_ips, event_types, severities
+        )
+    ]
+
+
 # =================================== INVALID EVENTS GENERATOR =========================================#
 def generate_invalid_event():
     event = generate_valid_event()
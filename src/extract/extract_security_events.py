@@ -1,83 +1,127 @@
 # Run this script in terminal: python3 -m src.extract.extract_security_events
 # This script will extract data from the API, validate the API response, and then upload it to the s3 raw bucket
 import os
+import atexit
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import zstandard
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from datetime import datetime, timezone
-from dotenv import load_dotenv
+from src.utils.config_loader import BASE_DIR, load_env
 from src.utils.logger import get_logger
-from src.extract.s3_uploader import upload_to_s3
+from src.extract.s3_uploader import upload_bytes_to_s3
 from src.validation.validate_api_response import validate_api_response
 
 
 # Load environmental variables into OS memory
-load_dotenv("config/.env")
+load_env()
 
 # Access environmental variables
-ENVIRONMENT = os.getenv("ENVIRONMENT")
+ENVIRONMENT = os.getenv("ENVIRONMENT", "local").lower()
 DATA_DIR = os.getenv("DATA_DIR")
 API_BASE_URL = os.getenv("API_BASE_URL")
 API_KEY = os.getenv("API_KEY")
+# Set RAW_COMPRESSION=zstd to write and upload raw files as .json.zst (default: plain JSON)
+RAW_COMPRESSION = os.getenv("RAW_COMPRESSION", "none").lower()
 
 
 # Initialize get_logger()
 # Set logging level
 logger = get_logger(__name__)
 
-# Dynamical resolve file paths
-# Get root directory
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
+# Dynamical resolve file paths (BASE_DIR is the project root from config_loader)
 # Dynamically create path to grab the latest batch_id from the .txt file
 latest_batch_path = os.path.join(BASE_DIR, "latest_batch_id.txt")
 
+# Root of the local raw files, resolved once (data/raw/{batch_id}/ directories live under it)
+raw_root = BASE_DIR / (DATA_DIR or "data") / "raw"
 
 
 
-# ENDPOINT FOR API that request will be made to
-url = f"{API_BASE_URL}/events/batch"
-# HEADER FOR AUTHORIZED USER / REQUESTS
-headers = {"x-api-key": API_KEY}
 
-batch_id = str(uuid.uuid4())
+# zstd level 3 compresses batch JSON several-fold at far less CPU than gzip -9
+raw_compressor = zstandard.ZstdCompressor(level=3) if RAW_COMPRESSION == "zstd" else None
 
-# Creates directory if it doesn't exist; if it does, ignore
-os.makedirs(os.path.join(BASE_DIR, "data", "raw", batch_id), exist_ok=True)
 
+# Query parameter bounds and their error messages, shared by every extract_data call
+MIN_SIZE = 1
+MIN_FAULT_RATE, MAX_FAULT_RATE = 0.0, 1.0
+SIZE_ERROR = f"Size must be >= {MIN_SIZE}"
+FAULT_RATE_ERROR = f"fault_rate must be between {MIN_FAULT_RATE} and {MAX_FAULT_RATE}"
 
 
-def extract_data(size, fault_rate, batch_id):
+# Creates a directory if it doesn't exist; if it does, ignore
+# Cached so repeated extracts into the same batch skip the mkdir/stat syscalls
+@lru_cache(maxsize=None)
+def ensure_dir(path):
+    path.mkdir(parents=True, exist_ok=True)
+    return path
 
-    # Timestamp instance for files
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
 
-    # Dynamically resolves file path to data/raw
-    raw_output_path = os.path.join(BASE_DIR, DATA_DIR, "raw", batch_id, f"raw_events_{timestamp}.json")
+# ENDPOINT FOR API that request will be made to
+url = f"{API_BASE_URL}/events/batch"
+
+# Shared HTTP session so repeated extracts reuse pooled keep-alive connections
+# instead of paying a TCP/TLS handshake on every request
+SESSION = requests.Session()
+# HEADER FOR AUTHORIZED USER / REQUESTS
+SESSION.headers.update({"x-api-key": API_KEY})
+adapter = HTTPAdapter(
+    # Sized for extract_many() running several extracts concurrently
+    pool_connections=16,
+    pool_maxsize=16,
+    # /events/batch is NOT idempotent: every call stores new events on the server.
+    # So only retry when the request was never processed: failed connects, and 429/503
+    # rejections (rate limited / unavailable). 500s and read errors are not retried, since
+    # the server may already have stored the batch and a retry would store duplicates.
+    max_retries=Retry(
+        total=3,
+        connect=3,
+        read=0,
+        status=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset({"GET"}),
+    ),
+)
+SESSION.mount("http://", adapter)
+SESSION.mount("https://", adapter)
+# Release pooled connections when the process exits
+atexit.register(SESSION.close)
+
+
+
+# Request one batch of events from the API and validate the response
+def fetch_batch(size, fault_rate):
 
     # Fast fail
     # Check if query paramters are valid
-    if size < 1:
-        raise ValueError("Size must be >= 1")
-    if not (0.0 <= fault_rate <= 1.0):
-        raise ValueError("fault_rate must be between 0.0 and 1.0")
+    if size < MIN_SIZE:
+        raise ValueError(SIZE_ERROR)
+    if not (MIN_FAULT_RATE <= fault_rate <= MAX_FAULT_RATE):
+        raise ValueError(FAULT_RATE_ERROR)
     
     # Query parameters
     params = {"size" : size, "fault_rate" : fault_rate}
 
     try:
     # GET request to API endpoints
-        response = requests.get(url,
-                                headers=headers, 
-                                params=params,
-                                # 5 secs to connect API, 15 secs to get response
-                                timeout=(5, 15)
-                                )
-        
-        # Raises HTTP response
-        response.raise_for_status()
-        # Convert API response (JSON TEXT) into Python Object
-        data = response.json()
+        with SESSION.get(url,
+                         params=params,
+                         # 5 secs to connect API, 15 secs to get response
+                         timeout=(5, 15),
+                         ) as response:
+
+            # Raises HTTP response
+            response.raise_for_status()
+            # Convert API response (JSON bytes) into Python Object
+            # response.content (not response.raw) so a timeout or dropped connection while the
+            # body is read is raised as a RequestException and handled below
+            data = orjson.loads(response.content)
 
     except requests.exceptions.RequestException as e:
         logger.error(
@@ -96,30 +140,64 @@ def extract_data(size, fault_rate, batch_id):
 
     # Validate API response
     validate_api_response(data, fault_rate)
-    
+
+    return data
+
+
+# Write a validated API batch to data/raw (local env only) and upload it to raw/{batch_id}/ in S3
+def store_raw_batch(data, batch_id):
+
+    # Timestamp instance for files
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    file_name = f"raw_events_{timestamp}.json"
+    if raw_compressor:
+        file_name += ".zst"
+
     # Add batch_id, and batch timestamp to 
     data["batch_id"] = batch_id
     data["batch_ts"] = timestamp
 
-    try:
-    # Write data to data/raw/f"raw_events_{timestamp}.json"
-        with open(raw_output_path, "w", encoding="utf-8") as f:
-        # write json data to file
-            json.dump(data, f, indent=4)
+    # Serialize once; the same buffer is written locally (local env only) and uploaded to S3
+    # Compact JSON: raw files are pipeline artifacts, not read by humans
+    payload = orjson.dumps(data)
+    if raw_compressor:
+        payload = raw_compressor.compress(payload)
+
+    s3_key = f"raw/{batch_id}/{file_name}"
+    # Where the batch was written; "path" is only added when a local copy exists
+    location = {"s3_key": s3_key}
+
+    # S3 is the source of truth; the local copy is only kept for local debugging
+    if ENVIRONMENT == "local":
+        # Dynamically resolves file path to data/raw/{batch_id}
+        batch_dir = raw_root / batch_id
+        raw_output_path = str(batch_dir / file_name)
+
+        try:
+            # Creates the batch directory under data/raw (once per batch_id per process)
+            ensure_dir(batch_dir)
+            # Write data to data/raw/f"raw_events_{timestamp}.json" through a 1 MiB buffer
+            with open(raw_output_path, "wb", buffering=1 << 20) as f:
+                # write json data to file
+                f.write(payload)
+
+        except OSError as e:
+            logger.error(
+                "Failed to write raw file",
+                extra={"path": raw_output_path}
+            )
+            raise
 
-
-    except OSError as e:
-        logger.error(
-            "Failed to write raw file",
-            extra={"path": raw_output_path}
-        )
-        raise
+        location["path"] = raw_output_path
 
 
     try:
-        s3_key = f"raw/{batch_id}/{os.path.basename(raw_output_path)}"
-        # upload data to s3 bucket
-        upload_to_s3(raw_output_path, s3_key)
+        extra_args = {"ContentType": "application/json"}
+        # Compressed files are tagged so readers know to decompress
+        if raw_compressor:
+            extra_args["ContentEncoding"] = "zstd"
+        # upload data to s3 bucket straight from memory
+        upload_bytes_to_s3(payload, s3_key, extra_args=extra_args)
 
         with open(latest_batch_path, "w") as f:
             f.write(batch_id)
@@ -134,7 +212,7 @@ def extract_data(size, fault_rate, batch_id):
     except Exception:
         logger.error(
             "Failed to upload raw file to S3",
-            extra={"path": raw_output_path, "s3_key": s3_key},
+            extra=location,
         )
         raise
 
@@ -144,8 +222,7 @@ def extract_data(size, fault_rate, batch_id):
         extra={
             "batch_id": batch_id,
             "batch_ts": timestamp,
-            "path": raw_output_path,
-            "s3_key": s3_key,
+            **location,
             "size": data["size"],
             "valid_events": data["valid_events"],
             "invalid_events": data["invalid_events"],
@@ -155,11 +232,52 @@ def extract_data(size, fault_rate, batch_id):
 
     # Return data
     return data
-    
-    
+
+
+# Extract one API batch into raw/{batch_id}/
+def extract_data(size, fault_rate, batch_id):
+    return store_raw_batch(fetch_batch(size, fault_rate), batch_id)
+
+
+# Extract several API batches concurrently into the same batch_id.
+# Each request is network-bound and independent, so threads overlap the request latency.
+# The responses are merged and stored as ONE raw file, so the loader pays a single
+# GET for the batch instead of one per request.
+def extract_many(n_batches, size, fault_rate, batch_id, max_workers=4):
+
+    if n_batches < 1:
+        raise ValueError("n_batches must be >= 1")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(fetch_batch, size, fault_rate)
+            for _ in range(n_batches)
+        ]
+        # .result() re-raises the first failure so Airflow sees it
+        results = [future.result() for future in futures]
+
+    # Same shape as a single API response, with the counts summed across requests
+    merged = {
+        "size": sum(result["size"] for result in results),
+        "fault_rate": fault_rate,
+        "valid_events": sum(result["valid_events"] for result in results),
+        "invalid_events": sum(result["invalid_events"] for result in results),
+        "events": [event for result in results for event in result["events"]],
+    }
+
+    logger.info(
+        "Successfully extracted batches concurrently",
+        extra={"batch_id": batch_id, "n_batches": n_batches, "max_workers": max_workers},
+    )
+
+    return store_raw_batch(merged, batch_id)
+
+
 # Smoke test
 if __name__ == "__main__":
     print("Extracting data from API")
+    # One batch_id per run, not per process import
+    batch_id = str(uuid.uuid4())
     data = extract_data(20, .25, batch_id)
     print("Response succesful and Data returned")
     print(data)
@@ -1,22 +1,33 @@
 # Run this script in the terminal using: python3 -m src.extract.s3_uploader
 # This file will upload the extracted data from the API into s3 raw bucket and into the data/raw directory
+import io
 import os
-from dotenv import load_dotenv
+from src.utils.config_loader import load_env
 from botocore.exceptions import ClientError
+from boto3.s3.transfer import TransferConfig
 from src.utils.logger import get_logger
-from src.utils.aws_client import get_s3_client
-from src.utils.aws_client import test_s3_connection
-from src.utils.aws_client import create_s3_structure
+from src.utils.aws_client import get_shared_s3_client
+from src.utils.aws_client import ensure_s3_structure
 
 
 # Load environment variables from .env file into memory
-load_dotenv("config/.env")
+load_env()
 
 
 # Load environment variables from .env file into memory
 ENVIRONMENT = os.getenv("ENVIRONMENT", "local").lower()
 S3_BUCKET = os.getenv("S3_BUCKET")
 AWS_REGION = os.getenv("AWS_REGION")
+# Multipart part size in MB (also the threshold for switching to multipart)
+S3_MULTIPART_CHUNK_MB = int(os.getenv("S3_MULTIPART_CHUNK_MB", "8"))
+
+# Upload large files as multipart with parts sent concurrently instead of one after another
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+    multipart_chunksize=S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True,
+)
 
 
 # Load LOG_LEVEL and ENVIRONMENT vars from .env
@@ -25,52 +36,71 @@ AWS_REGION = os.getenv("AWS_REGION")
 # ENVIRONMENT helps differentiate between environments like local, staging, or production for contextual logging.
 logger = get_logger(__name__)
 
+# Uploads use the shared S3 client from aws_client
+# Logging in the upload path uses %-style args so messages are only formatted when emitted;
+# per-upload progress is DEBUG and only the final success is INFO
+
 
-def upload_to_s3(local_path, s3_key):
+# extra_args is passed through to boto3 (e.g. ContentType / ContentEncoding)
+def upload_to_s3(local_path, s3_key, extra_args=None):
     try:
-        # Validate local file existence before doing any AWS work
-        if not os.path.exists(local_path):
-            raise FileNotFoundError(f"Local file not found: {local_path}")
-
-        # Sets up conifgurations for s3 bucket
-        logger.info("Initializing S3 client...")
-        # Initializes a boto3 S3 client instance to access S3 methods
-        s3 = get_s3_client()
-        logger.info("S3 client initialized successfully.")
-
-        logger.info("Testing S3 bucket connection...")
-        # Tests s3 connection
-        test_s3_connection()
-        logger.info("Connection to S3 bucket successful.")
-
-        logger.info("Verifying or creating S3 folder structure...")
-        # Creates or verifies s3 folder structure
-        create_s3_structure()
-        logger.info("S3 folder structure verified or created successfully.")
-
-        logger.info(f"Uploading file → {local_path} → s3://{S3_BUCKET}/{s3_key}")
+        # Shared S3 client; the folder structure is only verified on the first upload
+        s3 = get_shared_s3_client()
+        ensure_s3_structure()
+
+        logger.debug("Uploading file → %s → s3://%s/%s", local_path, S3_BUCKET, s3_key)
         # Uploads data into the specified S3 key within the bucket
         # local_path tells which file to upload
         # s3_bucket tells which s3 bucket to upload it to
         # s3_key tells which key to upload the data as a value
-        s3.upload_file(local_path, S3_BUCKET, s3_key)
-        logger.info(f"File uploaded successfully: s3://{S3_BUCKET}/{s3_key}")
+        # TRANSFER_CONFIG enables concurrent multipart uploads for large files
+        # No os.path.exists() pre-check: a missing file raises FileNotFoundError here (handled below)
+        s3.upload_file(local_path, S3_BUCKET, s3_key, ExtraArgs=extra_args, Config=TRANSFER_CONFIG)
+        logger.info("File uploaded successfully: s3://%s/%s", S3_BUCKET, s3_key)
 
     # Catch error and logs error to the log file
     except FileNotFoundError as e:
-        logger.error(f"File not found: {e}")
+        logger.error("File not found: %s", e)
         raise
     except ClientError as e:
-        logger.error(f"AWS ClientError while uploading to S3: {e}")
+        logger.error("AWS ClientError while uploading to S3: %s", e)
         raise
     except ValueError as e:
-        logger.error(f"ValueError during upload: {e}")
+        logger.error("ValueError during upload: %s", e)
         raise
     except TypeError as e:
-        logger.error(f"TypeError during upload: {e}")
+        logger.error("TypeError during upload: %s", e)
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error during S3 upload: %s", e)
+        raise
+
+
+# Upload an in-memory buffer straight to S3 (no local file round trip)
+# Small bodies go up in a single put_object; bodies above the multipart threshold use
+# upload_fileobj so they still get concurrent multipart parts from TRANSFER_CONFIG
+# bucket defaults to the configured S3_BUCKET
+# ensure_structure=False skips the one-time folder setup (writers that only target existing prefixes)
+def upload_bytes_to_s3(body, s3_key, extra_args=None, bucket=None, ensure_structure=True):
+    bucket = bucket or S3_BUCKET
+    try:
+        s3 = get_shared_s3_client()
+        if ensure_structure:
+            ensure_s3_structure()
+
+        logger.debug("Uploading %d bytes → s3://%s/%s", len(body), bucket, s3_key)
+        if len(body) > TRANSFER_CONFIG.multipart_threshold:
+            s3.upload_fileobj(io.BytesIO(body), bucket, s3_key, ExtraArgs=extra_args, Config=TRANSFER_CONFIG)
+        else:
+            s3.put_object(Bucket=bucket, Key=s3_key, Body=body, **(extra_args or {}))
+        logger.info("Buffer uploaded successfully: s3://%s/%s", bucket, s3_key)
+
+    # Catch error and logs error to the log file
+    except ClientError as e:
+        logger.error("AWS ClientError while uploading to S3: %s", e)
         raise
     except Exception as e:
-        logger.exception(f"Unexpected error during S3 upload: {e}")
+        logger.exception("Unexpected error during S3 upload: %s", e)
         raise
 
 
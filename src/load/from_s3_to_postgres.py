@@ -1,22 +1,32 @@
 # Run this script in terminal: python3 -m src.load.from_s3_to_postgres 
 # This script extracts data from s3 respective bucket and loads it into the respective postgres table
 import os
-import json
+import io
+import ijson
+import zstandard
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from json import JSONDecodeError
-from dotenv import load_dotenv
+from src.utils.config_loader import BASE_DIR, load_env
 from src.utils.logger import get_logger
-from src.transform.schema_definitions import build_raw_security_log
-from src.utils.aws_client import get_s3_client, test_s3_connection
-from src.utils.db_connection import get_connection
-from src.sql.sql_queries import RAW_INSERT_QUERY, INGESTION_LOG_INSERT
+from src.transform.schema_definitions import build_raw_security_log_rows
+from src.utils.aws_client import get_shared_s3_client
+from src.utils.db_connection import get_connection, release_connection, to_csv_field
+from src.sql.sql_queries import (
+    BULK_LOAD_SETTINGS_QUERY,
+    RAW_STAGE_CREATE_QUERY,
+    RAW_STAGE_COPY_QUERY,
+    RAW_STAGE_MERGE_QUERY,
+    INGESTION_LOG_INSERT,
+)
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError, NoCredentialsError, EndpointConnectionError
 
 # Load environment variables from .env file into memory
-load_dotenv("config/.env")
+load_env()
 S3_BUCKET = os.getenv("S3_BUCKET")
 S3_PREFIX_RAW = os.getenv("S3_PREFIX_RAW")
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Validate critical env vars early so we fail fast
 if not S3_BUCKET:
@@ -30,38 +40,81 @@ logger = get_logger(__name__)
 
 
 
-# Extract data from s3
-def extract_raw_events_from_s3(s3_prefix, batch_id):
+# Minimum file size to deal with ghost files
+MIN_FILE_SIZE_BYTES = 5 * 1024
 
-    full_prefix = f"{s3_prefix.rstrip('/')}/{batch_id}/"
+# Raw files opened ahead of the parser by stream_raw_events_from_s3 (also the pool size)
+# Each unread body holds a pooled connection, so keep this below S3_MAX_POOL_CONNECTIONS
+S3_DOWNLOAD_WORKERS = int(os.getenv("S3_DOWNLOAD_WORKERS", "32"))
 
-    logger.info(
-        "Extracting raw batch from S3",
-        extra={"batch_id": batch_id, "prefix": full_prefix},
-    )
+# Files at or above this size are fetched as concurrent ranged GETs instead of one stream
+RANGED_DOWNLOAD_THRESHOLD = 8 * 1024 * 1024
+RANGED_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=RANGED_DOWNLOAD_THRESHOLD,
+    multipart_chunksize=RANGED_DOWNLOAD_THRESHOLD,
+    max_concurrency=8,
+)
 
+# Keys requested per ListObjectsV2 page
+S3_LIST_PAGE_SIZE = 1000
+
+# Number of records written to the COPY buffer per chunk when loading
+LOAD_CHUNK_SIZE = 1000
+
+
+# Return the shared S3 client (created and verified once per process)
+def connect_s3():
     try:
-        s3 = get_s3_client()
-        test_s3_connection()
-        logger.info("S3 client initialized and connection successful.")
+        s3 = get_shared_s3_client()
+        logger.info("S3 client ready.")
+        return s3
     except (NoCredentialsError, EndpointConnectionError, ClientError) as e:
         logger.error(f"AWS connection error: {e}")
         raise
 
-    response = s3.list_objects_v2(Bucket=S3_BUCKET, Prefix=full_prefix)
-    contents = response.get("Contents")
+
+# List the usable raw files for a batch (skips ghost/undersized files)
+# Fills `sizes` (if given) with key -> size from the listing, so downloads can pick ranged vs single GET without a HEAD
+def list_raw_batch_keys(s3, s3_prefix, batch_id, sizes=None):
+
+    full_prefix = f"{s3_prefix.rstrip('/')}/{batch_id}/"
+
+    logger.info(
+        "Extracting raw batch from S3",
+        extra={"batch_id": batch_id, "prefix": full_prefix},
+    )
+
+    # Paginate so batches with more than 1000 objects are listed completely
+    # (1000 keys per page is the ListObjectsV2 maximum, so each round-trip returns a full page)
+    paginator = s3.get_paginator("list_objects_v2")
+    pages = paginator.paginate(
+        Bucket=S3_BUCKET,
+        Prefix=full_prefix,
+        PaginationConfig={"PageSize": S3_LIST_PAGE_SIZE},
+    )
+    contents = [
+        obj
+        for page in pages
+        for obj in page.get("Contents", [])
+    ]
 
     if not contents:
         raise ValueError(f"No data files found under prefix '{full_prefix}'")
 
     logger.info(f"Found {len(contents)} files under prefix '{full_prefix}'")
 
-    # Minimum file size to deal with ghost files
-    MIN_FILE_SIZE_BYTES = 5 * 1024
-    # Make sure files pass the minimum size
-    files = [obj for obj in contents if obj.get("Size", 0) > MIN_FILE_SIZE_BYTES]
-    # To see if there ghost files in our bucket
-    ghost_files = [obj for obj in contents if obj.get("Size", 0) == 0]
+    # Single pass over the listing:
+    # files must pass the minimum size, and empty objects are tracked to see if there ghost files in our bucket
+    files = []
+    ghost_files = []
+    for obj in contents:
+        size = obj.get("Size", 0)
+        # Compressed (.zst) batches can legitimately be smaller than the ghost-file threshold
+        min_size = 0 if obj["Key"].endswith(".zst") else MIN_FILE_SIZE_BYTES
+        if size > min_size:
+            files.append(obj)
+        elif size == 0:
+            ghost_files.append(obj)
 
     if ghost_files:
         logger.warning(f"Ghost files skipped: {[f['Key'] for f in ghost_files]}")
@@ -69,102 +122,209 @@ def extract_raw_events_from_s3(s3_prefix, batch_id):
     if not files:
         raise ValueError(f"No usable files found for batch {batch_id}")
 
-    all_events = []
-    s3_keys = []
-    batch_ts = None
+    if sizes is not None:
+        sizes.update((obj["Key"], obj["Size"]) for obj in files)
+
+    return [obj["Key"] for obj in files]
 
-    for obj in files:
-        # Grab the key for the object in the ob
-        s3_key = obj["Key"]
 
-        try:
-            response = s3.get_object(Bucket=S3_BUCKET, Key=s3_key)
-            data = response["Body"].read().decode("utf-8")
-            logger.info(f"Read {len(data)} bytes from '{s3_key}'")
-        except Exception as e:
-            logger.error(f"Error reading S3 object '{s3_key}': {e}")
-            raise
+# Incrementally parse one raw batch file from a file-like S3 body.
+# Yields ("event", event) for each element of "events" as soon as it is parsed,
+# plus ("batch_id", value) / ("batch_ts", value) when those keys are reached,
+# so memory stays bounded by one event instead of the whole file.
+def iter_raw_object(body, s3_key):
+    builder = None
+    saw_events = False
 
-        if not data.strip():
-            raise ValueError(f"S3 file {s3_key} is empty — cannot parse")
+    for prefix, event, value in ijson.parse(body, use_float=True):
+        if prefix == "events" and event == "start_array":
+            saw_events = True
+        elif prefix == "events.item" and event == "start_map":
+            builder = ijson.ObjectBuilder()
 
-        try:
-            data_obj = json.loads(data)
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == "events.item" and event == "end_map":
+                yield "event", builder.value
+                builder = None
+        elif prefix in ("batch_id", "batch_ts") and event == "string":
+            yield prefix, value
 
-            if "events" not in data_obj or not isinstance(data_obj["events"], list):
-                raise ValueError(f"'events' key missing or invalid format in {s3_key}")
+    if not saw_events:
+        raise ValueError(f"'events' key missing or invalid format in {s3_key}")
 
-        except (JSONDecodeError, UnicodeDecodeError, TypeError, ValueError) as e:
-            logger.error(f"Failed to parse/validate JSON from '{s3_key}': {e}")
-            raise
-        
-        # Make sure that the batch_id matches up with the current object in the respective s3 bucket
-        payload_batch_id = data_obj.get("batch_id")
-        if payload_batch_id != batch_id:
-            raise ValueError(
-                f"Batch mismatch in {s3_key}: expected {batch_id}, found {payload_batch_id}"
-            )
 
-        # Make sure we have the batch timestamp
-        if not batch_ts:
-            batch_ts = data_obj.get("batch_ts")
+# Open one raw file for streaming (runs on the prefetch pool in stream_raw_events_from_s3).
+# Returns the unread response body: only the GET round trip happens ahead of the parser,
+# the payload itself is read by ijson as it is parsed.
+def open_raw_object(s3, s3_key):
+    response = s3.get_object(Bucket=S3_BUCKET, Key=s3_key)
+    if not response.get("ContentLength"):
+        raise ValueError(f"S3 file {s3_key} is empty — cannot parse")
 
-        # .extend() iterates over its argument and adds each element individually
-        # .extend() is used to loop through the list of objects and add each object to the list individually as it own element
-        # .append() would add the whole list as a single element in the list
-        all_events.extend(data_obj["events"])
-        s3_keys.append(s3_key)
+    return response["Body"]
 
-    return batch_id, batch_ts, all_events, s3_keys
 
+# Download one large raw file into memory over parallel ranged GETs
+# Only used for files whose listed size reaches RANGED_DOWNLOAD_THRESHOLD, when the parser reaches them
+def download_raw_object(s3, s3_key):
+    body = io.BytesIO()
+    s3.download_fileobj(S3_BUCKET, s3_key, body, Config=RANGED_TRANSFER_CONFIG)
+    body.seek(0)
+    return body
 
 
+# Stream the events of every raw file in a batch, one event at a time, in listing order.
+# Fills `header` (if given) with the batch_ts found in the payloads.
+# GETs are issued ahead on a thread pool: up to S3_DOWNLOAD_WORKERS files are opened ahead of the
+# parser, so S3 round trips overlap. Prefetched bodies stay unread until parsed, so memory stays
+# bounded by one event plus socket buffers; large ranged files are downloaded only when reached.
+def stream_raw_events_from_s3(s3, s3_keys, batch_id, header=None, sizes=None):
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(S3_DOWNLOAD_WORKERS, len(s3_keys))))
+
+    # Large files are left for download_raw_object instead of being opened ahead
+    def prefetch(s3_key):
+        if sizes and sizes.get(s3_key, 0) >= RANGED_DOWNLOAD_THRESHOLD:
+            return s3_key, None
+        return s3_key, executor.submit(open_raw_object, s3, s3_key)
+
+    remaining_keys = iter(s3_keys)
+    pending = deque(prefetch(s3_key) for s3_key in islice(remaining_keys, S3_DOWNLOAD_WORKERS))
+
+    try:
+        while pending:
+            s3_key, future = pending.popleft()
+            # Keep the prefetch window full while this file is parsed
+            next_key = next(remaining_keys, None)
+            if next_key is not None:
+                pending.append(prefetch(next_key))
+
+            payload_batch_id = None
+            raw_body = None
+
+            try:
+                raw_body = future.result() if future is not None else download_raw_object(s3, s3_key)
+                body = raw_body
+
+                # zstd-compressed raw files are decompressed on the fly while streaming
+                if s3_key.endswith(".zst"):
+                    body = zstandard.ZstdDecompressor().stream_reader(body)
+
+                for kind, value in iter_raw_object(body, s3_key):
+                    if kind == "event":
+                        yield value
+                    elif kind == "batch_id":
+                        payload_batch_id = value
+                    elif kind == "batch_ts" and header is not None and not header.get("batch_ts"):
+                        # Make sure we have the batch timestamp
+                        header["batch_ts"] = value
+
+            except (ijson.JSONError, UnicodeDecodeError, TypeError, ValueError) as e:
+                logger.error(f"Failed to parse/validate JSON from '{s3_key}': {e}")
+                raise
+            except Exception as e:
+                logger.error(f"Error reading S3 object '{s3_key}': {e}")
+                raise
+            finally:
+                # Hand the HTTP connection back to the client's pool
+                if raw_body is not None:
+                    raw_body.close()
+
+            # Make sure that the batch_id matches up with the current object in the respective s3 bucket
+            if payload_batch_id != batch_id:
+                raise ValueError(
+                    f"Batch mismatch in {s3_key}: expected {batch_id}, found {payload_batch_id}"
+                )
+
+            logger.info(f"Finished streaming '{s3_key}'")
+
+    finally:
+        # Stop prefetching if the consumer fails or stops early
+        executor.shutdown(wait=False, cancel_futures=True)
+        # Release the connections of bodies that were opened but never parsed
+        for _, future in pending:
+            if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+                future.result().close()
+
+
+# Drop repeated event_ids from an event stream before they reach COPY
+# Duplicates would only be discarded by ON CONFLICT after costing serialization, COPY bytes and an index probe
+def unique_events(events):
+    seen = set()
+    for event in events:
+        event_id = event.get("event_id")
+        if event_id is not None:
+            if event_id in seen:
+                continue
+            seen.add(event_id)
+        yield event
+
+
+# Bulk load raw events with COPY instead of INSERT statements.
+# Each chunk of LOAD_CHUNK_SIZE records is COPYed into a temp staging table, then a single
+# INSERT ... SELECT ... ON CONFLICT DO NOTHING merges the batch, committed once.
+# Pass commit=False to leave the merge uncommitted so the caller can commit it together with
+# the ingestion_log row (log_ingestion_metadata) in one round trip.
+# Returns the number of records sent (after in-batch duplicates are dropped).
+def copy_raw_events_to_postgres(events, batch_id, conn, commit=True):
+    total = 0
+    events = unique_events(events)
 
-# Load extracted data from s3 to postgres 
-def load_events_to_postgres(events, batch_id, conn, insert_query, record_builder):
     try:
         with conn.cursor() as cursor:
-            # Prepare list of records to insert
-            # Creates of list of dicts that mapped according to the schema of the table
-            records = [record_builder(event, batch_id) for event in events]
+            cursor.execute(BULK_LOAD_SETTINGS_QUERY)
+            cursor.execute(RAW_STAGE_CREATE_QUERY)
 
-            if not records:
-                logger.warning("No records to insert into Postgres.")
-                return
+            while True:
+                # Rows come back as tuples already in RAW_COPY_COLUMNS order
+                records = build_raw_security_log_rows(islice(events, LOAD_CHUNK_SIZE), batch_id)
 
+                if not records:
+                    break
 
-            # Insert into database
-            cursor.executemany(insert_query, records)
-            conn.commit()
-            logger.info(f"{len(records)} records loaded into Postgres.")
+                buffer = io.BytesIO(
+                    b"".join(b",".join(map(to_csv_field, record)) + b"\n" for record in records)
+                )
+                cursor.copy_expert(RAW_STAGE_COPY_QUERY, buffer)
+                total += len(records)
 
+            if not total:
+                logger.warning("No records to insert into Postgres.")
+                conn.rollback()
+                return 0
+
+            cursor.execute(RAW_STAGE_MERGE_QUERY)
+            if commit:
+                conn.commit()
+            logger.info(f"{total} records copied into Postgres ({cursor.rowcount} new).")
+            return total
 
     except Exception as e:
-        logger.error(f"Failed to insert records into DB: {e}")
+        logger.error(f"Failed to copy records into DB: {e}")
         conn.rollback()
         raise
 
 
 # Logs metadata about the current ingestion batch to raw.ingestion_log.
-def log_ingestion_metadata(conn, batch_id, stage, s3_key, events, status="SUCCESS", error_message=None):
+# record_count overrides len(events) when the events were streamed rather than collected
+def log_ingestion_metadata(conn, batch_id, stage, s3_key, events, status="SUCCESS", error_message=None, record_count=None):
 
-
-    source_name = "security_event_api"  # or however you're identifying the source
-    file_name = s3_key
-    record_count = len(events)
-    started_at = datetime.now(timezone.utc)
-    finished_at = datetime.now(timezone.utc)
+    if record_count is None:
+        record_count = len(events)
+    # One timestamp for the log row: started_at and finished_at describe the same instant
+    now = datetime.now(timezone.utc)
 
     log_entry = {
         "batch_id": batch_id,
         "stage": stage,
-        "source_name": "security_event_api",
+        "source_name": "security_event_api",  # or however you're identifying the source
         "s3_key": s3_key,
-        "record_count": len(events),
+        "record_count": record_count,
         "status": status.upper(),
         "error_message": error_message,
-        "started_at": datetime.now(timezone.utc),
-        "finished_at": datetime.now(timezone.utc),
+        "started_at": now,
+        "finished_at": now,
     }
 
     try:
@@ -183,7 +343,6 @@ if __name__ == "__main__":
     conn = None
     s3_key = None
     s3_keys = []          
-    events = []
     with open(os.path.join(BASE_DIR, "latest_batch_id.txt")) as f:
         batch_id = f.read().strip()
 
@@ -195,19 +354,24 @@ if __name__ == "__main__":
         logger.info("Starting S3 → Postgres pipeline")
 
         conn = get_connection()
-        batch_id, batch_ts, events, s3_keys = extract_raw_events_from_s3(S3_PREFIX_RAW, batch_id)
-
+        s3 = connect_s3()
+        sizes = {}
+        s3_keys = list_raw_batch_keys(s3, S3_PREFIX_RAW, batch_id, sizes)
 
-        load_events_to_postgres(events, batch_id, conn, RAW_INSERT_QUERY, build_raw_security_log)
+        # Stream events straight from S3 into Postgres without holding the whole batch in memory
+        # The merge is left uncommitted so it lands in the same transaction as the SUCCESS log
+        events = stream_raw_events_from_s3(s3, s3_keys, batch_id, sizes=sizes)
+        record_count = copy_raw_events_to_postgres(events, batch_id, conn, commit=False)
 
-        # SUCCESS log
+        # SUCCESS log (commits the loaded rows and the log entry together)
         log_ingestion_metadata(
             conn,
             batch_id,
             stage="raw",
             s3_key=",".join(s3_keys),
-            events=events,
-            status="SUCCESS"
+            events=[],
+            status="SUCCESS",
+            record_count=record_count,
         )
 
     except Exception as e:
@@ -222,7 +386,7 @@ if __name__ == "__main__":
                     batch_id=batch_id,
                     stage="raw",
                     s3_key=",".join(s3_keys) if s3_keys else "UNKNOWN",  
-                    events=events or [],
+                    events=[],
                     status="FAILED",
                     error_message=str(e),
                 )
@@ -235,7 +399,7 @@ if __name__ == "__main__":
     finally:
         if conn:
             try:
-                conn.close()
-                logger.info("Database connection closed.")
+                release_connection(conn)
+                logger.info("Database connection released to pool.")
             except Exception as close_err:
-                logger.error(f"Failed to close DB connection: {close_err}")
+                logger.error(f"Failed to release DB connection: {close_err}")
@@ -3,62 +3,83 @@
 # Loads JSON files from data/raw/ → raw.security_logs
 # NOT used in production or Airflow
 import os
+import io
 import re
-import json
+import sys
+import mmap
+import orjson
 from datetime import datetime
-from dotenv import load_dotenv
-from src.utils.db_connection import get_connection
+from src.utils.config_loader import BASE_DIR, load_env
+from src.utils.db_connection import get_connection, release_connection, to_csv_field
 from src.utils.logger import get_logger
+from src.sql.sql_queries import BULK_LOAD_SETTINGS_QUERY
 
 # Load environment variables into OS memory
-load_dotenv("config/.env")
+load_env()
 
 # Access environment variables
-DATA_DIR = os.getenv("DATA_DIR")
+# Defaults to data/ (as in the extract step) so importing this module never fails on a missing var
+DATA_DIR = os.getenv("DATA_DIR", "data")
 
 # Initialize logger
 logger = get_logger(__name__)
 
-# Dynamically resolve base directory
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 # Directories
 valid_directory_path = os.path.join(BASE_DIR, DATA_DIR, "raw")
 invalid_directory_path = os.path.join(BASE_DIR, DATA_DIR, "dead_letter")
 
 # Regex pattern to match timestamps in filenames (YYYYMMDD_HHMMSS)
-pattern = r"\d{8}_\d{6}"
-
-# SQL query
-INSERT_QUERY = """
-INSERT INTO raw.security_logs (
-    event_id,
-    event_time,
-    source,
-    severity,
-    message,
-    raw_payload,
-    ingested_at
-)
-VALUES (
-    %(event_id)s,
-    %(event_time)s,
-    %(source)s,
-    %(severity)s,
-    %(message)s,
-    %(raw_payload)s,
-    CURRENT_TIMESTAMP
-)
+# Compiled once; the fixed-width digits sort chronologically as plain strings
+pattern = re.compile(r"\d{8}_\d{6}")
+
+# SQL queries
+# Each file is COPYed into a temp staging table, then merged with ON CONFLICT DO NOTHING
+# so the load stays idempotent. The staging table is dropped when the file's transaction ends.
+COPY_COLUMNS = "event_id, event_time, source, severity, message, raw_payload"
+
+STAGE_CREATE_QUERY = """
+CREATE TEMP TABLE IF NOT EXISTS local_security_logs_stage
+(LIKE raw.security_logs INCLUDING DEFAULTS)
+ON COMMIT DROP;
+"""
+
+STAGE_COPY_QUERY = f"""
+COPY local_security_logs_stage ({COPY_COLUMNS})
+FROM STDIN WITH (FORMAT csv);
+"""
+
+# rowcount of the merge is the number of new rows (duplicates are skipped)
+STAGE_MERGE_QUERY = f"""
+INSERT INTO raw.security_logs ({COPY_COLUMNS}, ingested_at)
+SELECT {COPY_COLUMNS}, CURRENT_TIMESTAMP
+FROM local_security_logs_stage
 ON CONFLICT (event_id) DO NOTHING;
 """
 
 
+# Parses an ISO-8601 event timestamp into a datetime
+# Python 3.11+ fromisoformat accepts a trailing 'Z' itself, so it is used directly;
+# older interpreters need the 'Z' rewritten to the +00:00 offset first
+if sys.version_info >= (3, 11):
+    parse_timestamp = datetime.fromisoformat
+else:
+    def parse_timestamp(ts):
+        if ts.endswith("Z"):
+            ts = ts[:-1] + "+00:00"
+        return datetime.fromisoformat(ts)
+
+
 # Helper: returns sorted list of timestamped files (newest → oldest)
 def get_timestamped_files(directory_path):
     try:
-        file_list = [
-            file for file in os.listdir(directory_path) if re.search(pattern, file)
-        ]
+        # One regex search per file, keeping the matched timestamp as the sort key
+        # scandir's DirEntry knows its type from the directory read, so is_file() needs no extra stat
+        with os.scandir(directory_path) as entries:
+            file_list = [
+                (match.group(), entry.name)
+                for entry in entries
+                if entry.is_file(follow_symlinks=False) and (match := pattern.search(entry.name))
+            ]
     except Exception as e:
         logger.error(f"Could not list files in {directory_path}: {e}")
         return []
@@ -68,15 +89,22 @@ def get_timestamped_files(directory_path):
         logger.error(f"No timestamped files found in {directory_path}")
         return []
 
-    sorted_files = sorted(
-        file_list,
-        key=lambda f: datetime.strptime(re.search(pattern, f).group(), "%Y%m%d_%H%M%S"),
-        reverse=True,
-    )
+    file_list.sort(reverse=True)
+    sorted_files = [file for _, file in file_list]
 
     return sorted_files
 
 
+# Parse a JSON file straight from a read-only memory map of it
+# orjson reads the page-cache-backed view directly, so the file is never copied into a bytes object
+def read_json_file(file_path):
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Release the view before the map closes (an exported buffer blocks close())
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+
 def load_json_to_postgres():
 
     conn = None
@@ -101,8 +129,7 @@ def load_json_to_postgres():
 
             try:
                 # Read the JSON file
-                with open(valid_file_path, "r", encoding="utf-8") as f:
-                    valid_data = json.load(f)
+                valid_data = read_json_file(valid_file_path)
 
                 # Must be list because extract step always writes lists
                 if not isinstance(valid_data, list):
@@ -127,50 +154,60 @@ def load_json_to_postgres():
                 skip_count = 0  # duplicates
                 error_count = 0
 
-                # Process records inside this file
+                # Build the row tuples for this file, then COPY them in one stream
+                # Repeated event_ids within the file are dropped here instead of by ON CONFLICT
+                records = []
+                seen_event_ids = set()
                 for record in valid_data:
                     try:
-                        # TIMESTAMP NORMALIZATION
-                        # Extract timestamp (ISO-8601 from EXTRACT step)
-                        ts = record["timestamp"]
+                        if record["event_id"] in seen_event_ids:
+                            continue
+                        seen_event_ids.add(record["event_id"])
 
-                        # If it ends with 'Z', convert to +00:00 offset format
-                        # Postgres handles this more consistently
-                        if ts.endswith("Z"):
-                            ts = ts[:-1] + "+00:00"
-
-                        # Convert normalized string → datetime object
+                        # TIMESTAMP NORMALIZATION
+                        # Convert the ISO-8601 string from the EXTRACT step → datetime object
                         # This ensures Postgres always gets a valid timestamp
-                        event_time = datetime.fromisoformat(ts)
+                        event_time = parse_timestamp(record["timestamp"])
                         # -----------------------------------------
 
-                        # Insert into DB
-                        cursor.execute(
-                            INSERT_QUERY,
-                            {
-                                "event_id": record["event_id"],
-                                "event_time": event_time,  # Use normalized timestamp
-                                "source": record["source_ip"],
-                                "severity": record["severity"],
-                                "message": record["description"],
+                        # Row in COPY_COLUMNS order
+                        records.append(
+                            (
+                                record["event_id"],
+                                event_time,  # Use normalized timestamp
+                                record["source_ip"],
+                                record["severity"],
+                                record["description"],
                                 # raw_payload must be JSON, NOT a Python dict.
-                                # json.dumps() converts Python dict → JSON string,
-                                # which Postgres can accept as JSON/JSONB.
-                                "raw_payload": json.dumps(record),
-                            },
+                                # orjson.dumps() converts Python dict → JSON bytes,
+                                # which go into the COPY buffer as-is.
+                                orjson.dumps(record),
+                            )
                         )
 
-                        # ON CONFLICT DO NOTHING makes duplicates invisible to rowcount
-                        if cursor.rowcount == 0:
-                            skip_count += 1
-                        else:
-                            insert_count += 1
-
                     except Exception as e:
                         logger.error(f"Record-level error in {valid_file_path}: {e}")
                         error_count += 1
                         break  # Stop processing this file
 
+                if error_count == 0:
+                    try:
+                        # Insert into DB: COPY into staging, then one merge statement
+                        buffer = io.BytesIO(
+                            b"".join(b",".join(map(to_csv_field, row)) + b"\n" for row in records)
+                        )
+                        cursor.execute(BULK_LOAD_SETTINGS_QUERY)
+                        cursor.execute(STAGE_CREATE_QUERY)
+                        cursor.copy_expert(STAGE_COPY_QUERY, buffer)
+                        cursor.execute(STAGE_MERGE_QUERY)
+                        # ON CONFLICT DO NOTHING leaves duplicates out of rowcount
+                        # (skips count both in-file and already-loaded duplicates)
+                        insert_count = cursor.rowcount
+                        skip_count = len(valid_data) - insert_count
+                    except Exception as e:
+                        logger.error(f"Insert error in {valid_file_path}: {e}")
+                        error_count += 1
+
                 if error_count == 0:
                     # Only commit if file succeeded
                     conn.commit()
@@ -201,8 +238,7 @@ def load_json_to_postgres():
             invalid_file_path = os.path.join(invalid_directory_path, file)
 
             try:
-                with open(invalid_file_path, "r", encoding="utf-8") as f:
-                    invalid_data = json.load(f)
+                invalid_data = read_json_file(invalid_file_path)
 
                 if isinstance(invalid_data, list):
                     logger.warning(
@@ -229,8 +265,8 @@ def load_json_to_postgres():
             logger.info("PostgreSQL cursor closed.")
 
         if conn is not None:
-            conn.close()
-            logger.info("PostgreSQL connection closed.")
+            release_connection(conn)
+            logger.info("PostgreSQL connection released to pool.")
 
 
 # Smoke test to see if everything loads to PostgreSQL DB
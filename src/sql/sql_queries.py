@@ -5,36 +5,47 @@ These queries define schema contracts and are imported by pipeline
 modules that perform inserts and logging.
 """
 
-# SQL insert query for raw.security_logs table
-RAW_INSERT_QUERY = """
-INSERT INTO raw.security_logs (
-    batch_id,
-    event_id,
-    event_time,
-    source_ip,
-    destination_ip,
-    event_type,
-    severity,
-    message,
-    raw_payload,
-    ingested_at
-)
-VALUES (
-    %(batch_id)s,
-    %(event_id)s,
-    %(event_time)s,
-    %(source_ip)s,
-    %(destination_ip)s,
-    %(event_type)s,
-    %(severity)s,
-    %(message)s,
-    %(raw_payload)s,
-    CURRENT_TIMESTAMP
+# Session settings for one bulk-load transaction (SET LOCAL reverts at commit/rollback)
+# synchronous_commit = off: COMMIT returns without waiting for the WAL fsync. A crash can lose the
+# last few commits but never corrupts data, and every load here is an idempotent ON CONFLICT merge
+# that can simply be re-run. work_mem gives the staging merges room to sort/hash in memory.
+BULK_LOAD_SETTINGS_QUERY = """
+SET LOCAL synchronous_commit = off;
+SET LOCAL work_mem = '256MB';
+"""
+
+# COPY-based bulk load for raw.security_logs
+# Rows are COPYed into a temp staging table, then merged with ON CONFLICT DO NOTHING
+# so the load stays idempotent. The staging table is dropped at commit.
+RAW_COPY_COLUMNS = (
+    "batch_id",
+    "event_id",
+    "event_time",
+    "source_ip",
+    "destination_ip",
+    "event_type",
+    "severity",
+    "message",
+    "raw_payload",
 )
-ON CONFLICT (event_id) DO NOTHING;
+
+RAW_STAGE_CREATE_QUERY = """
+CREATE TEMP TABLE IF NOT EXISTS security_logs_stage
+(LIKE raw.security_logs INCLUDING DEFAULTS)
+ON COMMIT DROP;
 """
 
+RAW_STAGE_COPY_QUERY = f"""
+COPY security_logs_stage ({", ".join(RAW_COPY_COLUMNS)})
+FROM STDIN WITH (FORMAT csv);
+"""
 
+RAW_STAGE_MERGE_QUERY = f"""
+INSERT INTO raw.security_logs ({", ".join(RAW_COPY_COLUMNS)}, ingested_at)
+SELECT {", ".join(RAW_COPY_COLUMNS)}, CURRENT_TIMESTAMP
+FROM security_logs_stage
+ON CONFLICT (event_id) DO NOTHING;
+"""
 
 # SQL insert query for raw.ingestion_log table
 INGESTION_LOG_INSERT = """
@@ -70,35 +81,42 @@ DO UPDATE SET
 """
 
 
-# SQL insert query for staging.parsed_events table
-PARSED_INSERT_QUERY = """
-INSERT INTO staging.parsed_events (
-    event_id,
-    event_time,
-    source_ip,
-    destination_ip,
-    event_type,
-    severity_level,
-    category,
-    normalized_message,
-    processed_at
-) VALUES (
-    %(event_id)s,
-    %(event_time)s,
-    %(source_ip)s,
-    %(destination_ip)s,
-    %(event_type)s,
-    %(severity_level)s,
-    %(category)s,
-    %(normalized_message)s,
-    %(processed_at)s
-);
-ON CONFLICT (event_id) DO NOTHING
+# COPY-based bulk load for staging.parsed_events (same staging-table pattern as raw.security_logs)
+# Valid events are COPYed as CSV into a temp table, then merged with ON CONFLICT DO NOTHING
+PARSED_COPY_COLUMNS = (
+    "event_id",
+    "event_time",
+    "source_ip",
+    "destination_ip",
+    "event_type",
+    "severity_level",
+    "category",
+    "normalized_message",
+    "processed_at",
+)
+
+PARSED_STAGE_CREATE_QUERY = """
+CREATE TEMP TABLE IF NOT EXISTS parsed_events_stage
+(LIKE staging.parsed_events INCLUDING DEFAULTS)
+ON COMMIT DROP;
 """
 
-# SQL insert query for staging.validation_errors table
-VALIDATION_ERROR_QUERY = """
-INSERT INTO staging.validation_errors (
+PARSED_STAGE_COPY_QUERY = f"""
+COPY parsed_events_stage ({", ".join(PARSED_COPY_COLUMNS)})
+FROM STDIN WITH (FORMAT csv);
+"""
+
+PARSED_STAGE_MERGE_QUERY = f"""
+INSERT INTO staging.parsed_events ({", ".join(PARSED_COPY_COLUMNS)})
+SELECT {", ".join(PARSED_COPY_COLUMNS)}
+FROM parsed_events_stage
+ON CONFLICT (event_id) DO NOTHING;
+"""
+
+# Validation errors carry a nested raw_event, so the whole error batch is sent as ONE JSON array
+# parameter and expanded server-side by json_populate_recordset, which types each field from the
+# target table's own row type
+VALIDATION_ERROR_COLUMNS = """
     event_id,
     event_time,
     source_ip,
@@ -107,15 +125,12 @@ INSERT INTO staging.validation_errors (
     error_type,
     error_message,
     logged_at
-) VALUES (
-    %(event_id)s,
-    %(event_time)s,
-    %(source_ip)s,
-    %(destination_ip)s,
-    %(raw_event)s,
-    %(error_type)s,
-    %(error_message)s,
-    %(logged_at)s
-);
-ON CONFLICT (event_id, error_type) DO NOTHING
+"""
+
+# SQL insert query for staging.validation_errors table
+VALIDATION_ERROR_QUERY = f"""
+INSERT INTO staging.validation_errors ({VALIDATION_ERROR_COLUMNS})
+SELECT {VALIDATION_ERROR_COLUMNS}
+FROM json_populate_recordset(NULL::staging.validation_errors, %s::json)
+ON CONFLICT (event_id, error_type) DO NOTHING;
 """
@@ -1,17 +1,14 @@
 # Run this script in terminal: python3 -m src.transform.s3_batch_writer
-import os
-import json
-import tempfile
-from datetime import datetime, timezone
-from src.utils.aws_client import get_s3_client, test_s3_connection
+import orjson
+from src.extract.s3_uploader import upload_bytes_to_s3
 from src.utils.logger import get_logger
 
 
 # Initialize logger
 logger = get_logger(__name__)
 
+
 def transformed_batch_to_s3(data, s3_bucket, s3_key):
-    file_path = None
     if not data:
         logger.info(
             "Skipping S3 upload — empty batch",
@@ -23,34 +20,18 @@ def transformed_batch_to_s3(data, s3_bucket, s3_key):
         return  # Deliberate no-op
 
     try:
-        with tempfile.NamedTemporaryFile(mode="w", delete=False) as tmp:
-            json.dump(data, tmp, indent=4, default=str)
-            # Make sure that the data is actually written
-            tmp.flush()
-            # Get file path to access it
-            file_path = tmp.name
-        s3 = get_s3_client()
-        logger.info("S3 Client Initialized")
-        # Test s3 conneciton
-        test_s3_connection()
-        logger.info("Connection to s3 successful!")
+        # Serialize the whole batch once and send the buffer as the object body
+        # (no temp file: avoids the write to disk, the re-read by upload_file and the cleanup)
+        # Compact JSON: staging/dead_letter files are read by the pipeline, not by humans
+        body = orjson.dumps(data, default=str)
 
-        s3.upload_file(file_path, s3_bucket, s3_key)
-        logger.info("Temp file data uploaded successfully!")
+        # Shared upload helper: same client, multipart threshold and TRANSFER_CONFIG as the extract step
+        # staging/ and dead_letter/ already exist by the time transform runs, so the folder checks are skipped
+        upload_bytes_to_s3(
+            body, s3_key, {"ContentType": "application/json"}, bucket=s3_bucket, ensure_structure=False
+        )
+        logger.info("Batch data uploaded successfully!")
 
     except Exception as e:
         logger.error("Unexpected error occurred")
         raise
-
-    finally:
-        if file_path and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                logger.warning(
-                    "Failed to clean up temp file after S3 upload",
-                    extra={
-                        "file_path": file_path,
-                        "error": str(e),
-                    },
-                )
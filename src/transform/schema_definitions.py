@@ -1,4 +1,4 @@
-import json
+import orjson
 from datetime import datetime, timezone
 
 
@@ -16,10 +16,30 @@ def build_raw_security_log(event: dict, batch_id: str) -> dict:
         "event_type": event.get("event_type"),
         "severity": event.get("severity"),
         "message": event.get("description") or "No message provided",
-        "raw_payload": json.dumps(event, default=str),
+        "raw_payload": orjson.dumps(event, default=str).decode(),
         # ingested_at is handled by DEFAULT / CURRENT_TIMESTAMP in SQL
     }
 
+# Bulk form of build_raw_security_log for the COPY load path
+# Builds one tuple per event in RAW_COPY_COLUMNS order instead of a dict per event,
+# with orjson.dumps bound to a local so the loop does no global/attribute lookups.
+# raw_payload stays as the UTF-8 bytes orjson produced; the COPY buffer is bytes too.
+def build_raw_security_log_rows(events, batch_id: str, _dumps=orjson.dumps) -> list[tuple]:
+    return [
+        (
+            batch_id,
+            event.get("event_id"),
+            event.get("timestamp"),
+            event.get("source_ip"),
+            event.get("destination_ip"),
+            event.get("event_type"),
+            event.get("severity"),
+            event.get("description") or "No message provided",
+            _dumps(event, default=str),
+        )
+        for event in events
+    ]
+
 # For staging.parsed_events table
 def build_staging_parsed_event(event: dict) -> dict:
     return {
@@ -35,14 +55,17 @@ def build_staging_parsed_event(event: dict) -> dict:
     }
 
 # For staging.validation_errors table
-def build_validation_error_record(event: dict, error: Exception) -> dict:
+# raw_event is kept as the event itself; it is serialized once, together with the whole
+# error batch, when the batch is written to S3 / sent to json_populate_recordset.
+# logged_at can be passed in so a whole batch shares one clock read
+def build_validation_error_record(event: dict, error: Exception, logged_at: datetime | None = None) -> dict:
     return {
         "event_id": event.get("event_id"),
         "event_time": event.get("event_time"),
         "source_ip": event.get("source_ip"),
         "destination_ip": event.get("destination_ip"),
-        "raw_event": json.dumps(event),
+        "raw_event": event,
         "error_type": type(error).__name__,
         "error_message": str(error),
-        "logged_at": datetime.now(timezone.utc),
+        "logged_at": logged_at or datetime.now(timezone.utc),
     }
\ No newline at end of file
@@ -1,33 +1,118 @@
 # Run this script in terminal: python3 -m src.transform.transform_security_events
+import io
 import os
-from dotenv import load_dotenv
+import logging
+import orjson
+from operator import itemgetter
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from src.utils.config_loader import BASE_DIR, load_env
 from datetime import datetime, timezone
-from src.utils.db_connection import get_connection
-from src.load.from_s3_to_postgres import extract_raw_events_from_s3
+from src.utils.db_connection import get_connection, release_connection, to_csv_field
+from src.load.from_s3_to_postgres import connect_s3, list_raw_batch_keys, stream_raw_events_from_s3
 from src.transform.schema_definitions import build_raw_security_log, build_staging_parsed_event, build_validation_error_record
 from src.utils.logger import get_logger
 from src.transform.validate_transform import validate_transformation
 from src.validation.validation_raw_events import canonicalize_event, validate_event, normalize_event
 from src.transform.s3_batch_writer import transformed_batch_to_s3
-from src.sql.sql_queries import PARSED_INSERT_QUERY, VALIDATION_ERROR_QUERY
+from src.sql.sql_queries import (
+    BULK_LOAD_SETTINGS_QUERY,
+    PARSED_COPY_COLUMNS,
+    PARSED_STAGE_CREATE_QUERY,
+    PARSED_STAGE_COPY_QUERY,
+    PARSED_STAGE_MERGE_QUERY,
+    VALIDATION_ERROR_QUERY,
+)
 
 logger = get_logger(__name__)
 
 # Load env vars into OS memory and access them
-load_dotenv("config/.env")
+load_env()
 S3_BUCKET = os.getenv("S3_BUCKET")
 S3_PREFIX_RAW = os.getenv("S3_PREFIX_RAW")
+# Worker processes for event validation (1 = validate in this process)
+TRANSFORM_WORKERS = int(os.getenv("TRANSFORM_WORKERS", "1"))
+# Events handed to a worker process per task
+TRANSFORM_CHUNK_SIZE = int(os.getenv("TRANSFORM_CHUNK_SIZE", "5000"))
 
 
-# Dynamical resolve file paths
-# Get root directory
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Pulls a staging record's values out in PARSED_COPY_COLUMNS order (one C-level call per row)
+parsed_copy_values = itemgetter(*PARSED_COPY_COLUMNS)
 
+
+# Dynamical resolve file paths (BASE_DIR is the project root from config_loader)
 # Dynamically create path to grab the latest batch_id from the .txt file
 latest_batch_path = os.path.join(BASE_DIR, "latest_batch_id.txt")
 
-with open(os.path.join(BASE_DIR, "latest_batch_id.txt")) as f:
-    batch_id = f.read().strip()
+
+# Reads the batch_id recorded by the extract step (only when a run needs it, not at import)
+def read_latest_batch_id():
+    with open(latest_batch_path) as f:
+        return f.read().strip()
+
+
+# Canonicalize, validate and normalize a sequence of raw events.
+# Returns (valid_events, invalid_events): staging records and validation error records.
+# Module-level so ProcessPoolExecutor workers can run it on a chunk of events.
+def transform_events(events, batch_id, batch_now):
+    valid_events = []
+    invalid_events = []
+
+    # Bind the per-event appends once so the loop body skips repeated attribute lookups
+    valid_append = valid_events.append
+    invalid_append = invalid_events.append
+
+    # Per-event trace logs are DEBUG-only; checked once so INFO runs skip building their extras
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+    # Per-event processing for canonicalization, validation, & normalization
+    # Each step works on the same canonical dict in place; only the staging record is a second dict
+    for raw_event in events:
+        # Dead-letter the raw event itself if the canonical record can't even be built
+        canonical_event = raw_event
+        try:
+            # Build canonical raw event (API → pipeline schema)
+            canonical_event = build_raw_security_log(raw_event, batch_id)
+
+            # Canonicalize values (strip, lowercase, normalize timestamp)
+            canonical_event = canonicalize_event(canonical_event)
+
+            # Validate canonical schema
+            validate_event(canonical_event, batch_now)
+
+            # Normalize (adds severity_level, category, normalized_message)
+            canonical_event = normalize_event(canonical_event, batch_now)
+
+            # Build staging record
+            parsed_event = build_staging_parsed_event(canonical_event)
+
+            # Validate transformation happened correctly
+            validate_transformation(canonical_event)
+
+            valid_append(parsed_event)
+
+            if debug_enabled:
+                logger.debug(
+                    "Event validated successfully",
+                    extra={"event_id": canonical_event.get("event_id"), "batch_id": batch_id},
+                )
+
+
+        except Exception as e:
+            logger.warning(
+                "Event failed validation",
+                extra={
+                    "event_id": raw_event.get("event_id"),
+                    "error": str(e),
+                },
+            )
+            error_record = build_validation_error_record(canonical_event, e, batch_now)
+            invalid_append(error_record)
+
+            # Will implement upload to S3 dead_letter later
+
+    return valid_events, invalid_events
 
 
 def run_transform_for_batch(batch_id: str):
@@ -35,14 +120,16 @@ def run_transform_for_batch(batch_id: str):
     valid_s3_key = f"staging/{batch_id}/valid_events_{timestamp}.json"
     invalid_s3_key = f"dead_letter/{batch_id}/invalid_events_{timestamp}.json"
 
-    # Extract batch from S3 
+    # List the batch in S3; events are streamed from it one at a time below,
+    # so the raw batch is never held in memory alongside the transformed records
     try:
-        payload_batch_id, batch_ts, all_events, s3_keys = extract_raw_events_from_s3(S3_PREFIX_RAW, batch_id)
+        s3 = connect_s3()
+        sizes = {}
+        s3_keys = list_raw_batch_keys(s3, S3_PREFIX_RAW, batch_id, sizes)
         logger.info(
             "Starting transform for batch",
             extra={
                 "batch_id": batch_id,
-                "total_events": len(all_events),
                 "s3_objects": len(s3_keys),
                 },
             )
@@ -53,8 +140,6 @@ def run_transform_for_batch(batch_id: str):
 
     conn = None
     cursor = None
-    valid_count = 0
-    invalid_count = 0
     # These list will be uploaded into respective s3 buckets
     # Store valid events
     valid_events = []
@@ -67,70 +152,62 @@ def run_transform_for_batch(batch_id: str):
         cursor = conn.cursor()
         logger.info("Database connection established")
 
-        # Per-event processing for canonicalization, validation, & normalization
-        for raw_event in all_events:
-            try:
-                # Build canonical raw event (API → pipeline schema)
-                canonical_event = build_raw_security_log(raw_event, batch_id)
-
-                logger.info(
-                    "Built canonical raw event",
-                    extra={"event_id": raw_event.get("event_id"), "batch_id": batch_id},
-                    )
-                
-                # Canonicalize values (strip, lowercase, normalize timestamp)
-                canonical_event = canonicalize_event(canonical_event)
-
-                # Validate canonical schema
-                validate_event(canonical_event)
-
-                # Normalize (adds severity_level, category, normalized_message)
-                canonical_event = normalize_event(canonical_event)
-                logger.info(
-                    "Canonical event validated and normalized",
-                    extra={"event_id": canonical_event.get("event_id")},
-                    )
-
-                # Build staging record
-                parsed_event = build_staging_parsed_event(canonical_event)
-
-                # Validate transformation happened correctly
-                validate_transformation(canonical_event)
-
-                valid_events.append(parsed_event)
-                valid_count += 1
-
-                logger.info(
-                    "Event validated successfully",
-                    extra={"event_id": canonical_event.get("event_id")},
+        # One clock read per batch: the validation window and processed_at share it
+        batch_now = datetime.now(timezone.utc)
+        events = stream_raw_events_from_s3(s3, s3_keys, batch_id, sizes=sizes)
+
+        if TRANSFORM_WORKERS > 1:
+            # CPU-bound validation runs in worker processes, one chunk of events per task.
+            # At most 2 chunks per worker are in flight, so the raw stream stays bounded in memory.
+            with ProcessPoolExecutor(max_workers=TRANSFORM_WORKERS) as executor:
+                pending = deque()
+                for chunk in iter(lambda: list(islice(events, TRANSFORM_CHUNK_SIZE)), []):
+                    pending.append(executor.submit(transform_events, chunk, batch_id, batch_now))
+                    if len(pending) >= 2 * TRANSFORM_WORKERS:
+                        valid_chunk, invalid_chunk = pending.popleft().result()
+                        valid_events.extend(valid_chunk)
+                        invalid_events.extend(invalid_chunk)
+                # Collect the rest in submission order
+                while pending:
+                    valid_chunk, invalid_chunk = pending.popleft().result()
+                    valid_events.extend(valid_chunk)
+                    invalid_events.extend(invalid_chunk)
+        else:
+            valid_events, invalid_events = transform_events(events, batch_id, batch_now)
+
+        valid_count = len(valid_events)
+        invalid_count = len(invalid_events)
+
+
+        # Upload staging and dead_letter outputs concurrently (each upload is network-bound)
+        upload_jobs = [(valid_events, valid_s3_key), (invalid_events, invalid_s3_key)]
+        with ThreadPoolExecutor(max_workers=len(upload_jobs)) as executor:
+            futures = [
+                executor.submit(transformed_batch_to_s3, data, S3_BUCKET, s3_key)
+                for data, s3_key in upload_jobs
+            ]
+            # .result() re-raises upload failures so the batch is rolled back
+            for future in as_completed(futures):
+                future.result()
+
+        cursor.execute(BULK_LOAD_SETTINGS_QUERY)
+
+        # Valid events are COPYed as CSV into a temp staging table and merged in one statement
+        if valid_events:
+            cursor.execute(PARSED_STAGE_CREATE_QUERY)
+            buffer = io.BytesIO(
+                b"".join(
+                    b",".join(map(to_csv_field, parsed_copy_values(event))) + b"\n"
+                    for event in valid_events
                 )
+            )
+            cursor.copy_expert(PARSED_STAGE_COPY_QUERY, buffer)
+            cursor.execute(PARSED_STAGE_MERGE_QUERY)
 
+        # Validation errors carry a nested raw_event, so they go over as one JSON array parameter
 
-            except Exception as e:
-                logger.warning(
-            "Event failed validation",
-            extra={
-                "event_id": raw_event.get("event_id"),
-                "error": str(e),
-            },
-        )
-                error_record = build_validation_error_record(canonical_event, e)
-                invalid_events.append(error_record)
-                invalid_count += 1
-
-
-                # Will implement upload to S3 dead_letter later
-
-
-        # Will implement upload to S3 staging later
-        transformed_batch_to_s3(valid_events, S3_BUCKET, valid_s3_key)
-        transformed_batch_to_s3(invalid_events, S3_BUCKET, invalid_s3_key)
-
-        for event in valid_events:
-            cursor.execute(PARSED_INSERT_QUERY, event)
-
-        for error_record in invalid_events:
-            cursor.execute(VALIDATION_ERROR_QUERY, error_record)
+        if invalid_events:
+            cursor.execute(VALIDATION_ERROR_QUERY, (orjson.dumps(invalid_events, default=str).decode(),))
 
         # Commit once per batch
         conn.commit()
@@ -138,6 +215,7 @@ def run_transform_for_batch(batch_id: str):
             "Transform completed",
             extra={
                 "batch_id": batch_id,
+                "total_events": valid_count + invalid_count,
                 "valid_events": valid_count,
                 "invalid_events": invalid_count,
                 "s3_keys": s3_keys,
@@ -154,7 +232,7 @@ def run_transform_for_batch(batch_id: str):
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
+            release_connection(conn)
 
     
 
@@ -164,7 +242,7 @@ def run_transform_for_batch(batch_id: str):
 if __name__ == "__main__":
     try:
         logger.info(f"Starting to extract from s3 raw bucket")
-        run_transform_for_batch(batch_id)
+        run_transform_for_batch(read_latest_batch_id())
         logger.info("Transformation phase completed successfully!")
     
     except Exception as e:
@@ -5,34 +5,41 @@ Is processed_at set and UTC?
 Is normalized_message non-empty?
 Did transform accidentally drop required canonical fields?
 '''
-from datetime import datetime, timezone
+from datetime import datetime, timedelta
 
-def validate_transformation(data: dict):
-    REQUIRED_TRANSFORM_FIELDS = [
-        "severity_level",
-        "category",
-        "normalized_message",
-        "processed_at",
-    ]
-    
-    REQUIRED_CANONICAL_FIELDS = [
+# Offset every processed_at must carry (built once, compared per event)
+UTC_OFFSET = timedelta(0)
+
+# Field lists are built once at import rather than on every call
+REQUIRED_TRANSFORM_FIELDS = (
+    "severity_level",
+    "category",
+    "normalized_message",
+    "processed_at",
+)
+
+REQUIRED_CANONICAL_FIELDS = (
     "event_id",
     "event_time",
     "source_ip",
     "destination_ip",
     "event_type",
     "severity",
-    ]
-
-    missing_canonical = [field for field in REQUIRED_CANONICAL_FIELDS if field not in data or data[field] is None]
-
-    if missing_canonical:
-        raise ValueError(f"Canonical field(s) missing after transform: {missing_canonical}")
+)
 
-    missing = [field for field in REQUIRED_TRANSFORM_FIELDS if field not in data or data[field] is None]
 
-    if missing:
-        raise ValueError(f"Missing transformed field(s) during post-transform validation: {missing}")
+def validate_transformation(data: dict):
+    # Fast path: the missing-field lists are only built when something is actually missing
+    get = data.get
+    for field in REQUIRED_CANONICAL_FIELDS:
+        if get(field) is None:
+            missing_canonical = [f for f in REQUIRED_CANONICAL_FIELDS if get(f) is None]
+            raise ValueError(f"Canonical field(s) missing after transform: {missing_canonical}")
+
+    for field in REQUIRED_TRANSFORM_FIELDS:
+        if get(field) is None:
+            missing = [f for f in REQUIRED_TRANSFORM_FIELDS if get(f) is None]
+            raise ValueError(f"Missing transformed field(s) during post-transform validation: {missing}")
 
     # Consistency checks
     if data["severity_level"] != data["severity"]:
@@ -44,20 +51,12 @@ def validate_transformation(data: dict):
     if not data["normalized_message"].strip():
         raise ValueError("normalized_message is empty")
     
+    # normalize_event always sets processed_at to an aware datetime, so no string parsing here.
+    # utcoffset() also accepts zero-offset tzinfo objects other than timezone.utc (and is None when naive)
     processed_at = data["processed_at"]
 
-    if isinstance(processed_at, str):
-        try:
-            processed_at = datetime.fromisoformat(processed_at)
-        except ValueError:
-            raise ValueError("processed_at is not a valid ISO datetime")
-
     if not isinstance(processed_at, datetime):
         raise ValueError("processed_at must be a datetime")
 
-    if processed_at.tzinfo is None or processed_at.tzinfo != timezone.utc:
+    if processed_at.utcoffset() != UTC_OFFSET:
         raise ValueError("processed_at must be timezone-aware and UTC")
-
-
-    
-
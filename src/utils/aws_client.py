@@ -1,39 +1,61 @@
 # Run this script in the terminal using: python3 -m src.utils.aws_client
 # The -m flag runs the file as a module (required because it imports other modules from the same package)
 import os
-from dotenv import load_dotenv
+import threading
 import boto3  # Used to create, configure, and manage AWS services and resources
+from botocore.config import Config
+from src.utils.config_loader import load_env
 from src.utils.logger import get_logger # imports get_logger functionality for modulairty
 
 
+# Load environment variables from .env file into memory
+load_env()
+
+# Access environment variables once at import instead of on every call
+# AWS environment variables
+AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
+AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
+AWS_REGION = os.getenv("AWS_REGION")
+S3_BUCKET = os.getenv("S3_BUCKET")
+ENVIRONMENT = os.getenv("ENVIRONMENT", "local")
+
+
 # Intialize logger functionality
 logger = get_logger(__name__)
 
+# Size of the client's HTTP connection pool (botocore defaults to 10)
+# Parallel uploads/downloads share one client, so each worker thread needs its own pooled connection
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "64"))
+
+# Set VERIFY_S3=0 to skip the head_bucket check when the shared client is first created
+VERIFY_S3 = os.getenv("VERIFY_S3", "1") == "1"
+
+# S3 client shared by every caller in this process (boto3 clients are thread-safe)
+shared_s3_client = None
+shared_s3_client_lock = threading.Lock()
+
+# Set once the bucket folder structure has been verified in this process (see ensure_s3_structure)
+s3_structure_ready = False
+s3_structure_lock = threading.Lock()
+
 
 
 # =============================== SETS UP/INITIALIZES CONNECTION  ==================================== #
 # DOESN'T TEST THE CONNECTION
 # Initializes and returns a boto3 S3 client object using credentials from .env.
 def get_s3_client():
-    # Access environment variables
-    # AWS environment variables
-    AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
-    AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-    AWS_REGION = os.getenv("AWS_REGION")
-    S3_BUCKET = os.getenv("S3_BUCKET")
-
     # Raises an error if any required environment variable is missing
-    # List of required vars from .env
-    required_vars = [
-        "AWS_ACCESS_KEY_ID",
-        "AWS_SECRET_ACCESS_KEY",
-        "AWS_REGION",
-        "S3_BUCKET",
-    ]
+    # Required vars from .env, mapped to the values read at import
+    required_vars = {
+        "AWS_ACCESS_KEY_ID": AWS_ACCESS_KEY_ID,
+        "AWS_SECRET_ACCESS_KEY": AWS_SECRET_ACCESS_KEY,
+        "AWS_REGION": AWS_REGION,
+        "S3_BUCKET": S3_BUCKET,
+    }
     # Loop through required_vars
-    for var in required_vars:
+    for var, value in required_vars.items():
         # Checks if var exists in memory
-        if not os.getenv(var):
+        if not value:
             # Stop execution immediately and bubble up the error and Airflow will decide what to do
             raise ValueError(f"Missing environment variable: {var}")
 
@@ -43,16 +65,34 @@ def get_s3_client():
         aws_access_key_id=AWS_ACCESS_KEY_ID,
         aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
         region_name=AWS_REGION,
+        config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS),
     )
 
 
+# ============================== SHARED CLIENT FOR PIPELINE CODE ================================= #
+# Returns the process-wide S3 client, creating it on first use
+# The bucket connection is tested once here instead of before every extract/upload
+def get_shared_s3_client():
+    global shared_s3_client
+
+    if shared_s3_client is None:
+        # Lock so concurrent first callers (thread pools) only initialize once
+        with shared_s3_client_lock:
+            if shared_s3_client is None:
+                client = get_s3_client()
+                if VERIFY_S3:
+                    test_s3_connection(client)
+                shared_s3_client = client
+
+    return shared_s3_client
+
+
 # ===================================== TESTS S3 BUCKET CONNECTION =============================== #
-def test_s3_connection():
-    # Access environment variables
-    S3_BUCKET = os.getenv("S3_BUCKET")
-    AWS_REGION = os.getenv("AWS_REGION")
+# Pass `s3` to test an existing client instead of creating a new one
+def test_s3_connection(s3=None):
     # Initializes the boto3 S3 client object from get_s3_client()
-    s3 = get_s3_client()
+    if s3 is None:
+        s3 = get_s3_client()
 
     # Try to connect to s3 bucket API
     try:
@@ -62,7 +102,7 @@ def test_s3_connection():
         # Logs successful connection to the log file
         logger.info(
             f"Connection to S3 bucket '{S3_BUCKET}' in region '{AWS_REGION}' successful. "
-            f"(ENV={os.getenv('ENVIRONMENT', 'local')}, REGION={AWS_REGION})."
+            f"(ENV={ENVIRONMENT}, REGION={AWS_REGION})."
         )
     # Catches error and logs error to the log file
     except Exception as e:
@@ -74,11 +114,11 @@ def test_s3_connection():
 # ===================================== CREATES S3 BUCKET FOLDERS =============================== #
 # Creates the folder structure (prefixes) in the configured S3 bucket
 # Mirrors the local data/ directory layout
-def create_s3_structure():
+# Pass `s3` to reuse an existing client instead of creating a new one
+def create_s3_structure(s3=None):
     # Initializes the boto3 S3 client object from get_s3_client()
-    s3 = get_s3_client()
-    # Access environment variables
-    S3_BUCKET = os.getenv("S3_BUCKET")
+    if s3 is None:
+        s3 = get_s3_client()
 
     # List of folders that need to be created in s3 bucket
     folders = ["raw/", "staging/", "archive/", "dead_letter/", "analytics/"]
@@ -95,7 +135,7 @@ def create_s3_structure():
                 # Logs the object exists already to the log file
                 logger.info(
                     f"Folder already exists: s3://{S3_BUCKET}/{folder} "
-                    f"(ENV={os.getenv('ENVIRONMENT', 'local')}, REGION={os.getenv('AWS_REGION')})."
+                    f"(ENV={ENVIRONMENT}, REGION={AWS_REGION})."
                 )
             else:
                 # Create folder since it doesn't exist yet
@@ -103,12 +143,12 @@ def create_s3_structure():
                 # Logs successful creation of the object to the log file
                 logger.info(
                     f"Created folder: s3://{S3_BUCKET}/{folder} "
-                    f"(ENV={os.getenv('ENVIRONMENT', 'local')}, REGION={os.getenv('AWS_REGION')})."
+                    f"(ENV={ENVIRONMENT}, REGION={AWS_REGION})."
                 )
         # Logs succesful verificaiton or creation to the log file
         logger.info(
             f"S3 folder structure verified/created in bucket '{S3_BUCKET}'. "
-            f"(ENV={os.getenv('ENVIRONMENT', 'local')}, REGION={os.getenv('AWS_REGION')})."
+            f"(ENV={ENVIRONMENT}, REGION={AWS_REGION})."
         )
     # Catch error and logs error to the log file
     except Exception as e:
@@ -117,6 +157,20 @@ def create_s3_structure():
         raise
 
 
+
+# Creates or verifies the S3 folder structure once per process, on the shared client
+# Uploads call this instead of repeating the folder checks for every file
+def ensure_s3_structure():
+    global s3_structure_ready
+
+    if not s3_structure_ready:
+        # Lock so concurrent first uploads (extract_many) only run the checks once
+        with s3_structure_lock:
+            if not s3_structure_ready:
+                create_s3_structure(get_shared_s3_client())
+                s3_structure_ready = True
+
+
 # Allows you to run smoke tests on the db connection whenever this file is executed directly
 # If this file is being executed directly run this
 # If this file is being imported don't run this
@@ -0,0 +1,21 @@
+# Shared configuration helpers for every pipeline module
+# Import BASE_DIR and call load_env() instead of repeating load_dotenv() and os.path.dirname chains per module
+from pathlib import Path
+from dotenv import load_dotenv
+
+
+# Project root (src/utils/config_loader.py → three levels up), resolved once at import
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+# Sentinel so config/.env is only parsed once per process, however many modules import it
+env_loaded = False
+
+
+# Load environment variables from config/.env into OS memory (first call only)
+# The path is anchored at BASE_DIR so it works from any working directory (e.g. an Airflow worker)
+def load_env():
+    global env_loaded
+
+    if not env_loaded:
+        load_dotenv(BASE_DIR / "config" / ".env")
+        env_loaded = True
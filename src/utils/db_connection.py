@@ -1,19 +1,33 @@
 # Run this script in the terminal using: python3 -m src.utils.db_connection
 # The -m flag runs the file as a module (required because it imports other modules from the same package)
 import os
-from dotenv import load_dotenv
+import atexit
+import threading
+from src.utils.config_loader import load_env
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from src.utils.logger import get_logger # imports get_logger functionality for modulairty
 
 
 # Load environment variables from .env file into memory
-load_dotenv("config/.env")
+load_env()
 
 
 
 # ENVIRONMENT helps differentiate between environments like local, staging, or production for contextual logging
 ENVIRONMENT = os.getenv("ENVIRONMENT", "local").lower()
 
+# Access environment variables once at import instead of on every get_connection() call
+# POSTGRES environment variables
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_NAME = os.getenv("DB_NAME")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+# If USE_SSL var doesn’t exist, use the default value "true" instead. Lowercase what is returned and make sure it is equal to "true"
+USE_SSL = os.getenv("USE_SSL", "true").lower() == "true"
+
 
 # Initialize logger
 # __name__ ensures logs identify which module generated the message (e.g., src.utils.db_connection)
@@ -21,85 +35,113 @@ logger = get_logger(__name__)
 
 
 
+# Process-wide connection pool, created on the first get_connection() call
+# Reusing pooled connections skips the TCP + SSL + auth handshake on every pipeline run
+connection_pool = None
+connection_pool_lock = threading.Lock()
+
+# Maximum number of pooled connections (AWS RDS limits concurrent connections)
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "8"))
+
+# TCP keepalive probes for pooled connections: idle connections to RDS are kept alive through
+# NAT/load balancer idle timeouts, and a dead peer is detected in seconds instead of hanging
+DB_KEEPALIVES_IDLE = int(os.getenv("DB_KEEPALIVES_IDLE", "30"))
+DB_KEEPALIVES_INTERVAL = int(os.getenv("DB_KEEPALIVES_INTERVAL", "10"))
+DB_KEEPALIVES_COUNT = int(os.getenv("DB_KEEPALIVES_COUNT", "3"))
+
+
 """
 Establishes a secure connection to the AWS RDS PostgreSQL database.
 Loads credentials from the .env file, validates all required environment variables,
-and returns a reusable psycopg2 connection object with SSL encryption enabled.
-The caller is responsible for closing the connection after use.
+and returns a psycopg2 connection with SSL encryption enabled, checked out of a
+ThreadedConnectionPool that is created on first use.
+The caller is responsible for handing the connection back with release_connection().
 """
 def get_connection():
-
-    # Access environment variables
-    # POSTGRES environment variables
-    DB_HOST = os.getenv("DB_HOST")
-    DB_PORT = os.getenv("DB_PORT")
-    DB_NAME = os.getenv("DB_NAME")
-    DB_USER = os.getenv("DB_USER")
-    DB_PASSWORD = os.getenv("DB_PASSWORD")
-    
-    
-    # If USE_SSL var doesn’t exist, use the default value "true" instead. Lowercase what is returned and make sure it is equal to "true"
-    USE_SSL = os.getenv("USE_SSL", "true").lower() == "true"
-
-
-    # Raises an error if any required environment variable is missing
-    # List of required vars from .env
-    required_vars = ["DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD"]
-    
-    # Loop through required_vars
-    for var in required_vars:
-        # Checks if var exists in memory
-        if not os.getenv(var):
-            # Raise an error if it doesn't exist with the var that is missing
-            raise ValueError(f"Missing environment variable: {var}")
-
-    # If USE_SSL is True, set sslmode to "require"; otherwise, set it to "disable"
-    # This allows SSL encryption to be toggled on or off via the .env configuration
-    ssl_mode = "require" if USE_SSL else "disable"
+    global connection_pool
 
     # Try to connect to AWS RDS PostgreSQL DB
     try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            sslmode=ssl_mode,  # Always encrypt traffic between my Python script and the database — no exceptions
-            connect_timeout=10,  # Wait 10 seconds to return a connection before running the except block
-        )
-        # Logs successful connection to the log file
-        logger.info(
-            f"Connection to database '{DB_NAME}' on host '{DB_HOST}' successful."
-            f"(ENV={ENVIRONMENT}, SSL={'ON' if USE_SSL else 'OFF'})."
-        )
+        if connection_pool is None:
+            # Lock so concurrent first callers only build one pool
+            with connection_pool_lock:
+                if connection_pool is None:
+                    # Raises an error if any required environment variable is missing
+                    # (checked once, when the pool is built; later calls only check out a connection)
+                    required_vars = {
+                        "DB_HOST": DB_HOST,
+                        "DB_PORT": DB_PORT,
+                        "DB_NAME": DB_NAME,
+                        "DB_USER": DB_USER,
+                        "DB_PASSWORD": DB_PASSWORD,
+                    }
+                    # Loop through required_vars
+                    for var, value in required_vars.items():
+                        # Checks if var exists in memory
+                        if not value:
+                            # Raise an error if it doesn't exist with the var that is missing
+                            raise ValueError(f"Missing environment variable: {var}")
+
+                    # If USE_SSL is True, set sslmode to "require"; otherwise, set it to "disable"
+                    # This allows SSL encryption to be toggled on or off via the .env configuration
+                    ssl_mode = "require" if USE_SSL else "disable"
+
+                    connection_pool = ThreadedConnectionPool(
+                        1,
+                        DB_POOL_MAX,
+                        dbname=DB_NAME,
+                        user=DB_USER,
+                        password=DB_PASSWORD,
+                        host=DB_HOST,
+                        port=DB_PORT,
+                        sslmode=ssl_mode,  # Always encrypt traffic between my Python script and the database — no exceptions
+                        connect_timeout=10,  # Wait 10 seconds to return a connection before running the except block
+                        keepalives=1,
+                        keepalives_idle=DB_KEEPALIVES_IDLE,
+                        keepalives_interval=DB_KEEPALIVES_INTERVAL,
+                        keepalives_count=DB_KEEPALIVES_COUNT,
+                    )
+                    # Close every pooled connection when the process exits
+                    atexit.register(connection_pool.closeall)
+                    # Logs successful connection to the log file
+                    logger.info(
+                        f"Connection to database '{DB_NAME}' on host '{DB_HOST}' successful."
+                        f"(ENV={ENVIRONMENT}, SSL={'ON' if USE_SSL else 'OFF'}, POOL_MAX={DB_POOL_MAX})."
+                    )
+
         # Returns a reusable psycopg2 connection object with SSL encryption enabled
-        return conn
+        return connection_pool.getconn()
     
     # Catch error and logs error to the log file
-    except psycopg2.Error as e:
+    # PoolError is raised when every pooled connection is already checked out
+    except (psycopg2.Error, PoolError) as e:
         logger.error(f"Connection failed: {e}")
-        # Check if conn exists in the local memory and if it contains a truthy value
-        if "conn" in locals() and conn:
-            # Closes the connection to stop leaks
-            conn.close()
-            # Logs warning to the log file
-            logger.warning("Connection closed after failure.")
         # Stop execution immediately and bubble up the error and Airflow will decide what to do
         raise
 
 
-"""
+# Hands a connection from get_connection() back to the pool.
+# Any open transaction is rolled back by the pool; broken connections are discarded instead of reused.
+def release_connection(conn):
+    if conn is None:
+        return
+
+    if connection_pool is None:
+        conn.close()
+        return
+
+    connection_pool.putconn(conn, close=bool(conn.closed))
 
-# This would be used in production to ensure connections are always closed,
-# Even if an exception occurs, by placing it in a finally block.
-Always run this in the end
-finally:
-If the conn var exists in the local memory and isn't empty close the connection
-We close the connection because AWS has a certain number of concurrent connections available
-if 'conn' in locals() and conn:
-    conn.close()
-"""
+
+# Formats one value as UTF-8 bytes for COPY ... WITH (FORMAT csv)
+# Non-null values are always quoted so empty strings stay distinct from NULL (an unquoted empty field)
+# bytes (e.g. an orjson payload) are quoted as-is, skipping a decode/encode round trip
+def to_csv_field(value):
+    if value is None:
+        return b""
+    if not isinstance(value, bytes):
+        value = str(value).encode()
+    return b'"' + value.replace(b'"', b'""') + b'"'
 
 
 # Allows you to run smoke tests on the db connection whenever this file is executed directly
@@ -110,8 +152,8 @@ if __name__ == "__main__":
         logger.info("Starting DB setup and connectivity check...")
         conn = get_connection()
         logger.info("Connection successful.")
-        conn.close()
-        logger.info("Connection closed.")
+        release_connection(conn)
+        logger.info("Connection released to pool.")
     except Exception as e:
         logger.error(f"Error: {e}")
         raise
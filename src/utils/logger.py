@@ -4,18 +4,119 @@ import logging
 import time
 import os
 import datetime
-import inspect
-from dotenv import load_dotenv
-from logging.handlers import RotatingFileHandler
+import sys
+import atexit
+import queue
+import threading
+import multiprocessing.util
+from src.utils.config_loader import BASE_DIR, load_env
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 
 
 # Load environment variables from .env file into OS memory
-load_dotenv("config/.env")
+load_env()
 # Access env variables from OS memory
 ENVIRONMENT = os.getenv("ENVIRONMENT", "local").lower()
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
+# Configured loggers by resolved name, so repeat get_logger calls return immediately
+loggers = {}
+
+# Determines how the log will look (shared by every handler)
+formatter = logging.Formatter(
+    "%(asctime)s | %(name)s | %(levelname)s | %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+formatter.converter = time.gmtime  # force UTC timestamps
+
+# Stream handler — prints logs to the console
+# One console handler for the whole process; %(name)s in the format tells modules apart
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(formatter)
+
+# Per-module file handlers by logger name (each module keeps its own file under logs/)
+file_handlers = {}
+
+
+# Listener-side handler that hands each record to its own module's file handler
+# One dict lookup per record, instead of every file handler filtering every record
+class ModuleFileRouter(logging.Handler):
+    def handle(self, record):
+        file_handler = file_handlers.get(record.name)
+        if file_handler is not None:
+            file_handler.handle(record)
+        return True
+
+
+# One in-memory queue and one background listener thread do the actual file/console writes
+# for every module logger. Log calls only append to the queue; the listener drains it.
+# The thread is only started by the first get_logger() call, so importing this module
+# (tests, tooling) does not spawn it.
+log_queue = queue.SimpleQueue()
+queue_listener = QueueListener(log_queue, stream_handler, ModuleFileRouter())
+queue_listener_started = False
+queue_listener_lock = threading.Lock()
+
+
+# Starts the listener thread once per process (first get_logger call)
+def start_queue_listener():
+    global queue_listener_started
+
+    if not queue_listener_started:
+        with queue_listener_lock:
+            if not queue_listener_started:
+                queue_listener.start()
+                queue_listener_started = True
+                register_exit_flush()
+
+
+# Flush and stop the listener on exit so no queued records are lost (safe to call twice)
+def stop_queue_listener():
+    global queue_listener_started
+
+    if queue_listener_started:
+        queue_listener_started = False
+        queue_listener.stop()
+
+
+atexit.register(stop_queue_listener)
+
+
+# Multiprocessing workers leave through os._exit (atexit never runs), so the flush is also
+# registered as a multiprocessing finalizer. Workers clear inherited finalizers on start-up
+# (after os-level fork hooks run), so it is registered again in every new worker.
+def register_exit_flush(_=None):
+    multiprocessing.util.Finalize(None, stop_queue_listener, exitpriority=0)
+
+
+multiprocessing.util.register_after_fork(register_exit_flush, register_exit_flush)
+
+
+# A forked worker (ProcessPoolExecutor) inherits the QueueHandlers but not the listener
+# thread, so point every logger at a fresh queue and start a fresh listener in the child.
+# (If the parent never started one, the child's first get_logger starts it)
+def restart_queue_listener():
+    global log_queue, queue_listener, queue_listener_lock, queue_listener_started
+
+    # The parent's lock may have been held by another thread at fork time
+    queue_listener_lock = threading.Lock()
+    if not queue_listener_started:
+        return
+
+    log_queue = queue.SimpleQueue()
+    for logger in loggers.values():
+        for handler in logger.handlers:
+            if isinstance(handler, QueueHandler):
+                handler.queue = log_queue
+    queue_listener = QueueListener(log_queue, *queue_listener.handlers)
+    queue_listener_started = False
+    start_queue_listener()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=restart_queue_listener)
+
 
 # Creates the logic and functionality to create logs.
 # This allows us to call the function without having to rewrite it multiple times
@@ -28,27 +129,28 @@ def get_logger(name=None):
     # This causes logs to be written to __main__.log instead of the correct module log.
     # The logic below dynamically detects the actual caller module or script path.
     if not name or name == "__main__":
-        # returns the function at the specific call stack
-        frame = inspect.stack()[1]
+        # returns the caller's frame directly (inspect.stack() would build every frame's context)
+        frame = sys._getframe(1)
         # returns the module where the function ran in the call stack
-        module = inspect.getmodule(frame[0])
+        module = sys.modules.get(frame.f_globals.get("__name__"))
 
         if module and module.__name__ != "__main__":
             name = module.__name__
         else:
             # Fallback: derive from relative file path
-            name = os.path.splitext(os.path.relpath(frame.filename, start=os.getcwd()))[
+            name = os.path.splitext(os.path.relpath(frame.f_code.co_filename, start=os.getcwd()))[
                 0
             ]
             name = name.replace(os.sep, ".")  # Convert path -> module style
 
+    # Already configured: skip the path and handler setup below
+    if name in loggers:
+        return loggers[name]
+
     # Derive the log path dynamically from the module name
     log_path = name.replace("src.", "").replace(".", "/")
 
-    # Base directory (project root)
-    BASE_DIR = os.path.dirname(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    )
+    # Logs live under the project root (BASE_DIR, resolved once in config_loader)
     log_dir = os.path.join(BASE_DIR, "logs", os.path.dirname(log_path))
     os.makedirs(log_dir, exist_ok=True)
 
@@ -73,30 +175,22 @@ def get_logger(name=None):
     # Where could be file, console, email, API
     # How could be written, sent, streamed, rotated, or discarded
     if not logger.handlers:
-        # Determines how the log will look
-        formatter = logging.Formatter(
-            "%(asctime)s | %(name)s | %(levelname)s | %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-        formatter.converter = time.gmtime  # force UTC timestamps
-
-        # Tells where the log will be written (not connected yet so nothing will be written until logger.addHandler())
+        # Tells where the log will be written (not connected yet so nothing will be written until it joins the listener)
         file_handler = RotatingFileHandler(
             log_file, maxBytes=5_000_000, backupCount=5, encoding="utf-8"
         )
 
         # Sets up the format of the log
         file_handler.setFormatter(formatter)
-        # Tells where the log will be written through the file handler variable and connect its (writes to the log to the file)
-        logger.addHandler(file_handler)
-
-        # Stream handler — prints logs to the console
-        # sends the logs to the terminal/console
-        stream_handler = logging.StreamHandler()
-        # sets the format for the logs to the terminal/console
-        stream_handler.setFormatter(formatter)
-        # Tells where the log will be written through the stream handler variable and connect it (writes it the console)
-        logger.addHandler(stream_handler)
+        # Registered for ModuleFileRouter, which routes this logger's records to it by name
+        file_handlers[name] = file_handler
+
+        # The logger itself only enqueues records; the shared listener thread writes them
+        # to the file and console handlers off the pipeline's critical path
+        logger.addHandler(QueueHandler(log_queue))
+        start_queue_listener()
+
+    loggers[name] = logger
 
     # return logger object so it can be used in the other modules so no set up is required
     return logger
@@ -1,48 +1,22 @@
-# Run script in terminal : python3 tests/test_db_connection.py
-import os
-from dotenv import load_dotenv
+# Run script in terminal : python3 -m tests.test_db_connection
+# Checks the same pooled connection path the pipeline uses (src.utils.db_connection),
+# so env validation, SSL and TCP keepalive settings live in one place
 import psycopg2
+from psycopg2.pool import PoolError
+from src.utils.db_connection import DB_HOST, DB_NAME, get_connection, release_connection
 
 
-# Load environment variables from .env file into memory
-load_dotenv("config/.env")
-
-
-# Access environment variables
-# POSTGRES environment variables
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-
-# Make sure env variables exists
-required_vars = ["DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD"]
-for var in required_vars:
-    # Checks if the value exists
-    if not os.getenv(var):
-        # Raise an error if it doesn't exist
-        raise ValueError(f"Missing environment variable: {var}")
-    
-    
 # Try to connect to AWS RDS PostgreSQL DB
+# get_connection() raises ValueError if a required environment variable is missing
+conn = None
 try:
-    conn = psycopg2.connect(
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
-        sslmode="require" # Always encrypt traffic between my Python script and the database — no exceptions.
-    )
+    conn = get_connection()
     print(f"✅ Connection to database '{DB_NAME}' on host '{DB_HOST}' successful.")
 # Catch error and print it
-except psycopg2.Error as e:
+except (psycopg2.Error, PoolError) as e:
     print(f"❌ Connection failed: {e}")
 # Always run this in the end
 finally:
-    # If the conn var exists in the local memory and isn't empty close the connection
-    # We close the connection because AWS has a certain number of concurrent connections available
-    if 'conn' in locals() and conn:
-        conn.close()
-
+    # Hand the connection back to the pool instead of closing it
+    # The pool closes every connection at exit (AWS has a certain number of concurrent connections available)
+    release_connection(conn)
@@ -1 +1,59 @@
+# Run script in terminal : python3 -m tests.test_validation (or: python3 -m pytest tests/test_validation.py)
+# Plain assertions for validate_event in src.validation.validation_raw_events
+from datetime import datetime, timezone
+from src.validation.validation_raw_events import validate_event
 
+
+# Fixed reference time so the 90-day timestamp window never drifts
+NOW = datetime(2026, 1, 15, 12, 0, 0, tzinfo=timezone.utc)
+
+
+# Returns a fresh valid event; tests overwrite single fields to break it
+def make_event(**overrides):
+    event = {
+        "event_id": "evt-0001",
+        "event_time": "2026-01-15T11:00:00Z",
+        "source_ip": "8.8.8.8",
+        "destination_ip": "10.0.0.5",
+        "event_type": "port_scan",
+        "severity": "high",
+        "message": "Port scan detected.",
+    }
+    event.update(overrides)
+    return event
+
+
+# Returns the ValueError message validate_event raises for an event
+def validation_error(event):
+    try:
+        validate_event(event, now=NOW)
+    except ValueError as e:
+        return str(e)
+    raise AssertionError("expected validate_event to raise ValueError")
+
+
+def test_valid_event_passes():
+    assert validate_event(make_event(), now=NOW) is True
+
+
+def test_out_of_range_octets_are_rejected():
+    assert validation_error(make_event(source_ip="999.999.999.999")) == "Invalid source_ip format: 999.999.999.999"
+
+
+# inet_pton is stricter than the old regex: leading-zero octets are rejected
+def test_leading_zero_octets_are_rejected():
+    assert validation_error(make_event(destination_ip="010.1.1.1")) == "Invalid destination_ip format: 010.1.1.1"
+
+
+# Length checks run with the type checks, so they are reported before domain errors
+def test_length_error_reported_before_domain_error():
+    event = make_event(event_id="x" * 129, severity="urgent")
+    assert validation_error(event) == "event_id length must be between 1 and 128 characters"
+
+
+if __name__ == "__main__":
+    test_valid_event_passes()
+    test_out_of_range_octets_are_rejected()
+    test_leading_zero_octets_are_rejected()
+    test_length_error_reported_before_domain_error()
+    print("✅ Validation checks passed.")